@@ -7,7 +7,21 @@ Assignment4
 # notes: some problems in set_key
 -----------------------------
 """
+import json
 import math
+import mmap
+import operator
+import os
+import struct
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import compress, repeat
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 import utilities
 
@@ -29,11 +43,11 @@ class PRNG:
                       bits (int): number of bits to generate
         Return:       output (str): random binary bits
         Description:  Blum Blum Shub PRNG Generator
-                      p and q should be primes congruent to 3
+                      p and q should be different primes congruent to 3
                       The seed is the nth prime number, where n = p*q
                       If the nth prime number is not relatively prime with n,
                           the next prime number is selected until a valid one is found
-                          The prime numbers are read from the file PRIMES_FILE (starting n=1)
+                          The prime numbers are read from PrimeTable (starting n=1)
                       If invalid input --> return error message
         ---------------------------------------------------
         """ 
@@ -44,35 +58,559 @@ class PRNG:
             return "Error(PRNG.BBS): invalid q"
         if bits <= 0 or type(bits) != int:
             return "Error(PRNG.BBS): invalid bits"
+        if p == q:
+            return "Error(PRNG.BBS): p and q should be different"
+
+        the_bits = BBSGenerator(p, q).next_bits(bits)
+        return format(the_bits, '0{}b'.format(bits))
+
+class LRUCache:
+    """
+    ----------------------------------------------------
+    Description: Mapping that keeps at most max_size entries
+                 When full, the least recently used entry is dropped first
+                 Used for the caches shared by all SDES objects
+    ----------------------------------------------------
+    """
+    DEFAULT_MAX_SIZE = 4096
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        """
+        ----------------------------------------------------
+        Parameters:   max_size (int): default = DEFAULT_MAX_SIZE
+                      _entries (OrderedDict): key --> value
+                      _hits (int)
+                      _misses (int)
+        Description:  Creates an empty cache
+        ---------------------------------------------------
+        """
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       size (int): #entries
+        ---------------------------------------------------
+        """
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        ----------------------------------------------------
+        Parameters:   key (hashable)
+        Return:       value (?): None if key is not in the cache
+        ---------------------------------------------------
+        """
+        value = self._entries.get(key)
+        if value is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """
+        ----------------------------------------------------
+        Parameters:   key (hashable)
+                      value (?): not None
+        Return:       no return
+        Description:  Adds or replaces an entry, drops the least recently
+                      used entry if the cache is full
+        ---------------------------------------------------
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+        return None
+
+    def get_stats(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       hits (int)
+                      misses (int)
+        ---------------------------------------------------
+        """
+        return self._hits, self._misses
+
+    def clear(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       no return
+        Description:  Drops all entries and resets the counters
+        ---------------------------------------------------
+        """
+        self._entries.clear()
+        self._hits = 0
+        self._misses = 0
+        return None
+
+class SeedCache(LRUCache):
+    """
+    ----------------------------------------------------
+    Description: LRU cache of BBS seeds: n = p*q --> (seed, x0)
+                 The seed search of BBS is only done on a miss
+                 At most max_size entries are kept, the least recently
+                     used entry is dropped first
+                 Entries can be saved to and loaded from a JSON file
+    ----------------------------------------------------
+    """
+    def __init__(self, max_size=LRUCache.DEFAULT_MAX_SIZE, filename=None):
+        """
+        ----------------------------------------------------
+        Parameters:   max_size (int): default = DEFAULT_MAX_SIZE
+                      filename (str): JSON file used by save and load,
+                          default = None (no file), loaded if it exists
+                      _entries (OrderedDict): n --> (seed, x0)
+        Description:  Creates a cache
+        ---------------------------------------------------
+        """
+        super().__init__(max_size)
+        self._filename = filename
+        if filename is not None and os.path.isfile(filename):
+            self.load(filename)
+
+    def get(self, n):
+        """
+        ----------------------------------------------------
+        Parameters:   n (int): p*q
+        Return:       seed (int): see BBSGenerator.find_seed
+                      x0 (int): seed^2 mod n
+        ---------------------------------------------------
+        """
+        entry = super().get(n)
+        if entry is None:
+            seed = BBSGenerator.find_seed(n)
+            entry = (seed, seed ** 2 % n)
+            self.put(n, entry)
+        return entry
 
-        the_bits = ""
-        n = p * q
-        with open("primes.txt") as f:
-            primes = f.read().strip("\n").split()
+    def save(self, filename=None):
+        """
+        ----------------------------------------------------
+        Parameters:   filename (str): default = None (filename of the cache)
+        Return:       success: True/False
+        Description:  Writes all entries to a JSON file as [n, seed, x0] lists
+                          from the least to the most recently used
+        Errors:       if no filename --> return False
+        ---------------------------------------------------
+        """
+        if filename is None:
+            filename = self._filename
+        if filename is None:
+            return False
+        with open(filename, 'w') as f:
+            json.dump([[n, seed, x0] for n, (seed, x0) in self._entries.items()], f)
+        return True
+
+    def load(self, filename=None):
+        """
+        ----------------------------------------------------
+        Parameters:   filename (str): default = None (filename of the cache)
+        Return:       success: True/False
+        Description:  Adds the entries of a JSON file written by save
+        Errors:       if no filename, missing or invalid file --> return False
+        ---------------------------------------------------
+        """
+        if filename is None:
+            filename = self._filename
+        if filename is None or not os.path.isfile(filename):
+            return False
+        try:
+            with open(filename) as f:
+                entries = json.load(f)
+            entries = [(int(n), (int(seed), int(x0))) for n, seed, x0 in entries]
+        except (ValueError, TypeError):
+            return False
+        for n, entry in entries:
+            self._entries[n] = entry
+            self._entries.move_to_end(n)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+        return True
+
+class BBSGenerator:
+    """
+    ----------------------------------------------------
+    Description: Stateful Blum Blum Shub generator
+                 Produces the same bits as PRNG.BBS(p, q, bits), but the seed
+                     is found once and later calls continue the stream
+                 x0 = seed^2 mod n, x(i) = x(i-1)^2 mod n, bit i = x(i) mod 2
+                 Any x(i) can be computed directly (see seek) as
+                     x0^(2^i mod lambda) mod n, where lambda = lcm(p-1, q-1)
+                 Seeds are shared by all generators through SEED_CACHE
+    ----------------------------------------------------
+    """
+    SEED_CACHE = SeedCache()
+
+    def __init__(self, p, q):
+        """
+        ----------------------------------------------------
+        Parameters:   p (int): a prime number congruent to 3 mod 4
+                      q (int): a prime number congruent to 3 mod 4
+                      _n (int): p*q
+                      _lambda (int): lcm(p-1, q-1)
+                      _x0 (int): initial state
+                      _x (int): current state x(_index)
+                      _index (int): #bits generated so far
+        Description:  Creates a generator, the seed is selected as in PRNG.BBS
+        Asserts:      p and q are positive integers congruent to 3 mod 4
+                      p and q are different (lambda is only valid for
+                          distinct primes)
+        ---------------------------------------------------
+        """
+        assert type(p) == int and type(q) == int and p > 0 and q > 0 \
+            and p % 4 == 3 and q % 4 == 3, 'invalid input'
+        assert p != q, 'Error(BBSGenerator): p and q should be different'
+        self._n = p * q
+        self._lambda = (p - 1) * (q - 1) // MOD.gcd(p - 1, q - 1)
+        self._x0 = BBSGenerator.SEED_CACHE.get(self._n)[1]
+        self._x = self._x0
+        self._index = 0
+
+    def __iter__(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       self (BBSGenerator)
+        Description:  Iterator interface, e.g. for bit in generator: ...
+                      Iterating continues the stream of next_bits
+        ---------------------------------------------------
+        """
+        return self
+
+    def __next__(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       bit (int): next bit (0 or 1)
+        Description:  Iterator interface, the stream never ends
+        ---------------------------------------------------
+        """
+        return self.next_bits(1)
+
+    @staticmethod
+    def get_seed(n):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   n (int): p*q
+        Return:       seed (int): seed of n from SEED_CACHE
+        ---------------------------------------------------
+        """
+        return BBSGenerator.SEED_CACHE.get(n)[0]
+
+    @staticmethod
+    def find_seed(n):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   n (int): p*q
+        Return:       seed (int): the nth prime, or the first prime after it
+                          that is relatively prime to n
+        Description:  Seed search of BBS (not cached)
+        ---------------------------------------------------
+        """
         s = n
-        i = primes[n - 1]
-        while not MOD.is_relatively_prime(n, i):
-            i = primes[s]
+        seed = PrimeTable.get_prime(s)
+        while not MOD.is_relatively_prime(n, seed):
             s += 1
+            seed = PrimeTable.get_prime(s)
+        return seed
+
+    def get_index(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       index (int): #bits generated (or skipped) so far
+        ---------------------------------------------------
+        """
+        return self._index
+
+    def next_bits(self, k):
+        """
+        ----------------------------------------------------
+        Parameters:   k (int): #bits
+        Return:       bits (int): the next k bits, the first one is the most
+                          significant bit
+        Description:  format(bits, '0kb') is the string PRNG.BBS would return
+                          for the same bits
+        Errors:       if k is not a non-negative integer --> return -1
+        ---------------------------------------------------
+        """
+        if type(k) != int or k < 0:
+            return -1
+        x = self._x
+        n = self._n
+        bits = 0
+        for _ in range(k):
+            x = x * x % n
+            bits = (bits << 1) | (x & 1)
+        self._x = x
+        self._index += k
+        return bits
+
+    def read_bytes(self, n):
+        """
+        ----------------------------------------------------
+        Parameters:   n (int): #bytes
+        Return:       data (bytes): the next 8n bits, most significant bit first
+        Errors:       if n is not a non-negative integer --> return b''
+        ---------------------------------------------------
+        """
+        if type(n) != int or n < 0:
+            return b''
+        return self.next_bits(8 * n).to_bytes(n, 'big')
+
+    def seek(self, i):
+        """
+        ----------------------------------------------------
+        Parameters:   i (int): #bits to skip from the start of the stream
+        Return:       success: True/False
+        Description:  Moves the generator so that the next bit is bit i+1
+                      x(i) is computed directly, without the previous states
+                      (p and q are distinct primes, see __init__)
+        Errors:       if i is not a non-negative integer --> return False
+        ---------------------------------------------------
+        """
+        if type(i) != int or i < 0:
+            return False
+        self._x = pow(self._x0, pow(2, i, self._lambda), self._n)
+        self._index = i
+        return True
+
+class PrimeTable:
+    """
+    ----------------------------------------------------
+    Description: Table of prime numbers, loaded once per process
+                 Sources, in order of preference:
+                     BINARY_FILE: little-endian 4-byte integers, memory-mapped
+                         (the nth prime is at offset 4*(n-1))
+                     PRNG.PRIMES_FILE: whitespace separated text, parsed once
+                 Primes beyond the table are generated by a segmented sieve
+                     and kept as 8-byte integers
+                 Use convert() to create BINARY_FILE from the text file,
+                     the binary format holds primes up to BINARY_MAX only
+    ----------------------------------------------------
+    """
+    BINARY_FILE = 'primes.bin'
+    BINARY_MAX = 2 ** 32 - 1
+    SEGMENT_SIZE = 2 ** 18
+    _table = None
+    _count = 0
+    _extension = array('Q')
+    _base_primes = array('I')
+    _base_limit = 1
+
+    @staticmethod
+    def get_prime(n):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   n (int): index of prime number (starting n=1)
+        Return:       prime (int): the nth prime number
+        Description:  Returns the nth prime from the prime table
+                      If the table does not cover n, the missing primes are
+                          generated with a segmented sieve and kept in memory
+        Errors:       if n is not a positive integer, return:
+                        'Error(PrimeTable.get_prime): invalid n'
+        ---------------------------------------------------
+        """
+        if type(n) != int or n < 1:
+            return 'Error(PrimeTable.get_prime): invalid n'
+        if PrimeTable._table is None:
+            PrimeTable._load()
+        if n <= PrimeTable._count:
+            if isinstance(PrimeTable._table, mmap.mmap):
+                return struct.unpack_from('<I', PrimeTable._table, 4 * (n - 1))[0]
+            return PrimeTable._table[n - 1]
+        extension = PrimeTable._extension
+        while PrimeTable._count + len(extension) < n:
+            if extension:
+                last = extension[-1]
+            elif PrimeTable._count > 0:
+                last = PrimeTable.get_prime(PrimeTable._count)
+            else:
+                last = 1
+            missing = n - PrimeTable._count - len(extension)
+            # primes are at most ~ln(x) apart, sieve enough for the missing ones
+            span = max(PrimeTable.SEGMENT_SIZE, int(missing * (math.log(last + missing) + 2)))
+            extension.extend(PrimeTable.sieve(last + 1, last + 1 + span))
+        return extension[n - PrimeTable._count - 1]
+
+    @staticmethod
+    def _load():
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   -
+        Return:       no return
+        Description:  Loads the prime table from BINARY_FILE or PRNG.PRIMES_FILE
+                      An empty table is used if none of them exists
+        ---------------------------------------------------
+        """
+        if os.path.isfile(PrimeTable.BINARY_FILE) and os.path.getsize(PrimeTable.BINARY_FILE) >= 4:
+            with open(PrimeTable.BINARY_FILE, 'rb') as f:
+                PrimeTable._table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            PrimeTable._count = len(PrimeTable._table) // 4
+        elif os.path.isfile(PRNG.PRIMES_FILE):
+            with open(PRNG.PRIMES_FILE) as f:
+                primes = [int(p) for p in f.read().split()]
+            typecode = 'I' if not primes or max(primes) <= PrimeTable.BINARY_MAX else 'Q'
+            PrimeTable._table = array(typecode, primes)
+            PrimeTable._count = len(PrimeTable._table)
+        else:
+            PrimeTable._table = array('I')
+            PrimeTable._count = 0
+        return None
+
+    @staticmethod
+    def reset():
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   -
+        Return:       no return
+        Description:  Drops the loaded table and the sieved primes
+                      The next get_prime reloads the table, e.g. after convert()
+        ---------------------------------------------------
+        """
+        if isinstance(PrimeTable._table, mmap.mmap):
+            PrimeTable._table.close()
+        PrimeTable._table = None
+        PrimeTable._count = 0
+        PrimeTable._extension = array('Q')
+        return None
+
+    @staticmethod
+    def convert(text_file=None, binary_file=None):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   text_file (str): default = PRNG.PRIMES_FILE
+                      binary_file (str): default = BINARY_FILE
+        Return:       count (int): number of primes written
+        Description:  Converts a text file of primes into the binary format
+                      read by PrimeTable (little-endian 4-byte integers)
+                      The text file is processed in chunks
+        Errors:       if a prime is larger than BINARY_MAX, the binary file
+                      is removed and the method returns:
+                        'Error(PrimeTable.convert): prime out of range'
+        ---------------------------------------------------
+        """
+        if text_file is None:
+            text_file = PRNG.PRIMES_FILE
+        if binary_file is None:
+            binary_file = PrimeTable.BINARY_FILE
+        count = 0
+        rest = ''
+        with open(text_file) as infile, open(binary_file, 'wb') as outfile:
+            while True:
+                chunk = infile.read(2 ** 20)
+                items = (rest + chunk).split()
+                if chunk and items and not chunk[-1].isspace():
+                    rest = items.pop()
+                else:
+                    rest = ''
+                try:
+                    primes = array('I', map(int, items))
+                except OverflowError:
+                    count = -1
+                    break
+                if struct.pack('=I', 1) != struct.pack('<I', 1):
+                    primes.byteswap()
+                outfile.write(primes.tobytes())
+                count += len(primes)
+                if not chunk:
+                    break
+        if count == -1:
+            os.remove(binary_file)
+            return 'Error(PrimeTable.convert): prime out of range'
+        return count
 
-        x = int(i) ** 2 % n
-        for i in range(1, bits + 1):
-            x = x ** 2 % n
-            b = x % 2
-            the_bits += str(b)
-        return the_bits
+    @staticmethod
+    def sieve(start, end):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   start (int)
+                      end (int)
+        Return:       primes (list): all primes p such that start <= p < end
+        Description:  Segmented sieve of Eratosthenes
+                      The range is sieved SEGMENT_SIZE numbers at a time using
+                          the primes up to sqrt(end), which are cached
+        ---------------------------------------------------
+        """
+        start = max(start, 2)
+        primes = []
+        if end <= start:
+            return primes
+        base_primes = PrimeTable._get_base_primes(math.isqrt(end - 1))
+        for low in range(start, end, PrimeTable.SEGMENT_SIZE):
+            high = min(low + PrimeTable.SEGMENT_SIZE, end)
+            segment = bytearray([1]) * (high - low)
+            for p in base_primes:
+                if p * p >= high:
+                    break
+                first = max(p * p, (low + p - 1) // p * p)
+                segment[first - low::p] = bytes(len(range(first - low, high - low, p)))
+            primes.extend(compress(range(low, high), segment))
+        return primes
+
+    @staticmethod
+    def _get_base_primes(limit):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   limit (int)
+        Return:       primes (array): all primes <= limit (possibly more)
+        Description:  Simple sieve of Eratosthenes used by sieve
+                      The result is cached and only recomputed for larger limits
+        ---------------------------------------------------
+        """
+        if limit > PrimeTable._base_limit:
+            limit = max(limit, 2 * PrimeTable._base_limit)
+            flags = bytearray([1]) * (limit + 1)
+            flags[0:2] = b'\x00\x00'
+            for i in range(2, math.isqrt(limit) + 1):
+                if flags[i]:
+                    flags[i * i::i] = bytes(len(range(i * i, limit + 1, i)))
+            PrimeTable._base_primes = array('I', compress(range(limit + 1), flags))
+            PrimeTable._base_limit = limit
+        return PrimeTable._base_primes
 
 class SBOX:
     """
     ----------------------------------------------------
     Description: SDES SBOX
+                 Besides _box, every input is precomputed in two tables:
+                     _table: input (int) --> output (int)
+                     _strings: input (str) --> output (str)
+                 Files are parsed once per process and cached in _FILES by
+                     absolute path, a file is parsed again only if modified
+                 The contents of sbox1.txt and sbox2.txt are embedded as
+                     SBOX1_TEXT and SBOX2_TEXT (see from_text)
     ----------------------------------------------------
     """
+    __slots__ = ('_box', '_size', '_table', '_strings')
+    SBOX1_TEXT = '101-010-001-110-011-100-111-000\n001-100-110-010-000-111-101-011'
+    SBOX2_TEXT = '100-000-110-101-111-001-011-010\n101-011-000-111-110-010-001-100'
+    _FILES = {}
+
     def __init__(self, filename=""):
         """
         ----------------------------------------------------
         Parameters:   _box (list): default value = [[],[]]
                       _size (int): #bits for input, default = 0
+                      _table (list): sbox output (int) of every input
+                      _strings (dict): sbox output (str) of every input
         Description:  Creates an SBOX from a given file
                       The contents of the file are read into a 2D list
                       The size represent #bits for the sbox input
@@ -107,7 +645,7 @@ class SBOX:
         ---------------------------------------------------
         """ 
         # your code here
-        return self._box
+        return [row[:] for row in self._box]
     
     def get_size(self):
         """
@@ -132,18 +670,67 @@ class SBOX:
                       where n is the size
                       update values of _box and _size
                       assume that the file always has valid content
+                      The size is the #bits of an item + 1 (any size)
+                      A relative filename that does not exist in the current
+                          directory is looked up in the directory of this module
         ---------------------------------------------------
         """ 
         # your code here
         if filename == "":
             self._box = [[], []]
+            self._table = []
+            self._strings = {}
         else:
-            with open(filename) as f:
-                content = f.read()
-            sc = content.strip("\n").split()
-            bc = [sc[0].split("-"), sc[1].split("-")]
-            self._box = bc
-            self._size = len(str(self._box[0][0])) + 1
+            path = filename
+            if not os.path.isabs(path) and not os.path.isfile(path):
+                path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+            path = os.path.abspath(path)
+            version = os.stat(path).st_mtime_ns
+            cached = SBOX._FILES.get(path)
+            if cached is None or cached[0] != version:
+                with open(path) as f:
+                    content = f.read()
+                cached = (version, SBOX.from_text(content))
+                SBOX._FILES[path] = cached
+            self._copy(cached[1])
+        return None
+
+    @staticmethod
+    def from_text(content):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   content (str): contents of an sbox file
+        Return:       sbox (SBOX)
+        Description:  Creates an SBOX without reading a file
+                      e.g. SBOX.from_text(SBOX.SBOX1_TEXT)
+        ---------------------------------------------------
+        """
+        sbox = SBOX()
+        sc = content.strip("\n").split()
+        bc = [sc[0].split("-"), sc[1].split("-")]
+        sbox._box = bc
+        sbox._size = len(str(sbox._box[0][0])) + 1
+        column_bits = sbox._size - 1
+        outputs = [sbox._box[v >> column_bits][v & ((1 << column_bits) - 1)]
+                   for v in range(2 ** sbox._size)]
+        sbox._table = [int(output, 2) for output in outputs]
+        sbox._strings = {format(v, '0{}b'.format(sbox._size)): outputs[v] for v in range(len(outputs))}
+        return sbox
+
+    def _copy(self, other):
+        """
+        ----------------------------------------------------
+        Parameters:   other (SBOX)
+        Return:       no return
+        Description:  Copies the contents of other into this SBOX
+                      Lookup tables are shared, they are never modified
+        ---------------------------------------------------
+        """
+        self._box = [row[:] for row in other._box]
+        self._size = other._size
+        self._table = other._table
+        self._strings = other._strings
         return None
     
     def substitute(self,value):
@@ -152,14 +739,31 @@ class SBOX:
         Parameters:   value (str): sbox input (binary num of size bits)
         Return:       result (str): sbox output (binary num of size-1 bits)
         Description:  substitute <value> to corresponding output in sbox
-                      if invalid input return ''
+                      The most significant bit selects the row
+                      and the remaining bits select the column
+                      if empty sbox or invalid input return ''
         ---------------------------------------------------
         """ 
         # your code here
-        if self.is_empty() or type(value) != str or len(value) != 4:
+        if type(value) != str:
             return ""
-        return str(self._box[int(value[0])][utilities.bin_to_dec(value[1::])])
+        return self._strings.get(value, "")
     
+    def substitute_int(self,value):
+        """
+        ----------------------------------------------------
+        Parameters:   value (int): sbox input (size bits)
+        Return:       result (int): sbox output (size-1 bits)
+        Description:  Integer version of substitute
+                      The most significant bit selects the row
+                      and the remaining bits select the column
+                      if empty sbox or invalid input return -1
+        ---------------------------------------------------
+        """
+        if type(value) != int or value < 0 or value >= len(self._table):
+            return -1
+        return self._table[value]
+
     def __str__(self):
         """
         ----------------------------------------------------
@@ -176,6 +780,115 @@ class SBOX:
         whole_string = f"SBOX({self._size}):\n{self._box[0]}\n{self._box[1]}"
         return whole_string
 
+class FrozenSBOX(SBOX):
+    """
+    ----------------------------------------------------
+    Description: Immutable and hashable SBOX
+                 Two frozen sboxes are equal if they have the same contents
+                 Instances are shared through SBoxRegistry
+    ----------------------------------------------------
+    """
+    __slots__ = ('_content', '_hash')
+
+    def __init__(self, sbox):
+        """
+        ----------------------------------------------------
+        Parameters:   sbox (SBOX): contents to copy
+                      _content (tuple): rows of _box as tuples
+                      _hash (int): hash of _content
+        Description:  Creates a frozen copy of the given sbox
+        ---------------------------------------------------
+        """
+        self._copy(sbox)
+        self._content = tuple([tuple(row) for row in self._box])
+        self._hash = hash(self._content)
+
+    def set_box(self,filename):
+        """
+        ----------------------------------------------------
+        Parameters:   filename (str)
+        Return:       no return
+        Description:  A frozen sbox cannot be changed
+                      prints an error msg and keeps the current contents
+        ---------------------------------------------------
+        """
+        print("Error(FrozenSBOX.set_box): immutable sbox")
+        return None
+
+    def __eq__(self, other):
+        """
+        ----------------------------------------------------
+        Parameters:   other (?)
+        Return:       True/False
+        Description:  True if other is a FrozenSBOX with the same contents
+        ---------------------------------------------------
+        """
+        return isinstance(other, FrozenSBOX) and (self is other or self._content == other._content)
+
+    def __hash__(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       hash (int): hash of the contents, computed once
+        ---------------------------------------------------
+        """
+        return self._hash
+
+class SBoxRegistry:
+    """
+    ----------------------------------------------------
+    Description: Process-wide registry of frozen sboxes
+                 intern returns one shared FrozenSBOX per distinct contents,
+                     so SDES objects with the same sboxes share the same
+                     instances and their lookup tables
+                 sboxes can also be registered under a name (e.g. sbox1)
+                 Entries are never dropped, there is one per distinct
+                     sbox contents used in the process
+    ----------------------------------------------------
+    """
+    _BOXES = {}
+    _NAMES = {}
+
+    @staticmethod
+    def intern(sbox):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   sbox (SBOX)
+        Return:       frozen (FrozenSBOX): shared sbox with the same contents
+        ---------------------------------------------------
+        """
+        frozen = sbox if isinstance(sbox, FrozenSBOX) else FrozenSBOX(sbox)
+        return SBoxRegistry._BOXES.setdefault(frozen, frozen)
+
+    @staticmethod
+    def register(name, sbox):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   name (str)
+                      sbox (SBOX)
+        Return:       frozen (FrozenSBOX): the interned sbox
+        Description:  Interns sbox and registers it under name
+                      replaces any sbox registered under the same name
+        ---------------------------------------------------
+        """
+        frozen = SBoxRegistry.intern(sbox)
+        SBoxRegistry._NAMES[name] = frozen
+        return frozen
+
+    @staticmethod
+    def get(name):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   name (str)
+        Return:       frozen (FrozenSBOX): sbox registered under name
+                          None if no sbox has this name
+        ---------------------------------------------------
+        """
+        return SBoxRegistry._NAMES.get(name)
+
 class SDES:
     DEFAULT_ENCODING = 'B6'
     DEFAULT_BLOCK_SIZE = 12
@@ -183,9 +896,22 @@ class SDES:
     DEFAULT_ROUNDS = 2
     DEFAULT_P = 103
     DEFAULT_Q = 199
-    DEFAULT_SBOX1 = SBOX('sbox1.txt')
-    DEFAULT_SBOX2 = SBOX('sbox2.txt')
+    DEFAULT_SBOX1 = SBoxRegistry.register('sbox1', SBOX.from_text(SBOX.SBOX1_TEXT))
+    DEFAULT_SBOX2 = SBoxRegistry.register('sbox2', SBOX.from_text(SBOX.SBOX2_TEXT))
     DEFAULT_PAD = 'Q'
+    DEFAULT_ENGINE = 'feistel'
+    DEFAULT_CHUNK_SIZE = 65536
+    NUMPY_MIN_BLOCKS = 1024
+    PARALLEL_MIN_BLOCKS = 65536
+    MODES = ["ECB", "CBC", "CTR", "OFB"]
+    MAX_CACHED_SCHEDULES = 1024
+    MAX_CACHED_CODEBOOKS = 256
+    MAX_CACHED_OFB_CYCLES = 64
+    _SCHEDULES = LRUCache(MAX_CACHED_SCHEDULES)
+    _CODEBOOKS = LRUCache(MAX_CACHED_CODEBOOKS)
+    _OFB_CYCLES = LRUCache(MAX_CACHED_OFB_CYCLES)
+    _executor = None
+    _executor_workers = 0
 
     def __init__(self):
         """
@@ -199,6 +925,8 @@ class SDES:
                       _sbox1 (SBOX)
                       _sbox2 (SBOX)
                       _pad (str)
+                      _engine (str): feistel or codebook
+                      _cache (bool): share key schedules through class caches
         Description:  Constructs an SDES object
                       All parameters are set to default values
         ---------------------------------------------------
@@ -213,6 +941,12 @@ class SDES:
         self._sbox1 = self.DEFAULT_SBOX1
         self._sbox2 = self.DEFAULT_SBOX2
         self._pad = self.DEFAULT_PAD
+        self._engine = self.DEFAULT_ENGINE
+        self._cache = True
+        self._key = None
+        self._schedule = None
+        self._codebook = None
+        self._ofb_positions = {}
 
         
     def get_value(self,parameter):
@@ -223,7 +957,7 @@ class SDES:
         Description:  Returns a copy of parameter value
                       Valid parameter names:
                       rounds, key_length, block_size
-                      encoding, p, q, sbox1, sbox2, pad
+                      encoding, p, q, sbox1, sbox2, pad, engine, cache
                       if invalid parameter name --> print error msg & return ''
         ---------------------------------------------------
         """
@@ -246,6 +980,10 @@ class SDES:
             return self._sbox2
         if parameter == "pad":
             return self._pad
+        if parameter == "engine":
+            return self._engine
+        if parameter == "cache":
+            return self._cache
         print("Error(SDES.get_value): undefined parameter")
         return ""
 
@@ -259,12 +997,23 @@ class SDES:
                       if invalid value, do not update current value
                       if invalid parameter name, print error msg and return ''
                       rounds should be an integer larger than 1
-                      p and q should be integers congruent to 3 mod 4
+                      p and q should be different primes congruent to 3 mod 4
                       pad should be a single character string in B6 encoding
                       sbox1 and sbox2 should be non-empty SBOX objects
+                          or names of sboxes in SBoxRegistry
+                          a frozen copy of the sbox is interned in SBoxRegistry
+                          sbox size should be (block_size//2 + 2)//2
                       block_size should be an integer of multiples of 2, >= 4
                           sets also key_length to block_size//2 + 3
+                          installed sboxes should match the new block size
                       cannot set key_length directly
+                      engine should be 'feistel' or 'codebook'
+                          codebook precomputes the whole block permutation
+                          and is only available for block sizes up to 16
+                      cache should be True or False
+                          True (default): key schedules, codebooks and OFB
+                          cycles are shared with other SDES objects
+                          False: they are only kept by this object
                       If invalid value, return False
                       if invalid parameter name, print error msg and return False
         ---------------------------------------------------
@@ -273,6 +1022,7 @@ class SDES:
         if parameter == "rounds":
             if value > 1 and type(value) == int:
                 self._rounds = value
+                self._reset_key_schedule()
                 return True
             else:
                 return False
@@ -281,12 +1031,18 @@ class SDES:
                 print("Error(SDES.set_parameter): undefined operation")
                 return False
             self._key_length = value
+            self._reset_key_schedule()
             return True
         if parameter == "block_size":
             if value != 12 or type(value) != int:
                 return False
+            size = (value // 2 + 2) // 2
+            for sbox in (self._sbox1, self._sbox2):
+                if not sbox.is_empty() and sbox.get_size() != size:
+                    return False
             self._block_size = value
-            self._key_length = (self._block_size / 2) + 3
+            self._key_length = (self._block_size // 2) + 3
+            self._reset_key_schedule()
             return True
         if parameter == "encoding":
             if value != "B6":
@@ -294,30 +1050,54 @@ class SDES:
             self._encoding = value
             return True
         if parameter == "p":
-            if type(value) != int or value % 4 != 3 or not MOD.is_prime(value):
+            if type(value) != int or value % 4 != 3 or not MOD.is_prime(value) or value == self._q:
                 return False
             self._p = value
+            self._reset_key_schedule()
             return True
         if parameter == "q":
-            if type(value) != int or value % 4 != 3 or not MOD.is_prime(value):
+            if type(value) != int or value % 4 != 3 or not MOD.is_prime(value) or value == self._p:
                 return False
             self._q = value
+            self._reset_key_schedule()
             return True
         if parameter == "sbox1":
-            if value.is_empty():
+            if type(value) == str:
+                value = SBoxRegistry.get(value)
+            if not isinstance(value, SBOX) or value.is_empty():
                 return False
-            self._sbox1 = value
+            if value.get_size() != (self._block_size // 2 + 2) // 2:
+                return False
+            self._sbox1 = SBoxRegistry.intern(value)
+            self._reset_key_schedule()
             return True
         if parameter == "sbox2":
-            if value.is_empty():
+            if type(value) == str:
+                value = SBoxRegistry.get(value)
+            if not isinstance(value, SBOX) or value.is_empty():
+                return False
+            if value.get_size() != (self._block_size // 2 + 2) // 2:
                 return False
-            self._sbox2 = value
+            self._sbox2 = SBoxRegistry.intern(value)
+            self._reset_key_schedule()
             return True
         if parameter == "pad":
             if type(value) != str or len(value) != 1 or value not in utilities.get_base("B6"):
                 return False
             self._pad = value
             return True
+        if parameter == "engine":
+            if value == "codebook" and self._block_size > 16:
+                return False
+            if value != "feistel" and value != "codebook":
+                return False
+            self._engine = value
+            return True
+        if parameter == "cache":
+            if type(value) != bool:
+                return False
+            self._cache = value
+            return True
         print("Error(SDES.set_parameter): undefined operation")
         return False
 
@@ -332,7 +1112,26 @@ class SDES:
         ---------------------------------------------------
         """
         # your code here
-        return PRNG.BBS(self._p, self._q, self._key_length)
+        if self._key is None:
+            self._key = PRNG.BBS(self._p, self._q, self._key_length)
+        return self._key
+
+    def set_key(self,key):
+        """
+        ----------------------------------------------------
+        Parameters:   key (str): binary number of key_length bits
+        Return:       success: True/False
+        Description:  Sets the SDES key directly instead of using BBS
+                      The key is replaced by the BBS key as soon as a
+                          parameter of the key schedule is changed
+                      If invalid key, return False
+        ---------------------------------------------------
+        """
+        if type(key) != str or len(key) != self._key_length or not utilities.is_binary(key):
+            return False
+        self._reset_key_schedule()
+        self._key = key
+        return True
     
     def get_subkey(self,i):
         """
@@ -351,7 +1150,387 @@ class SDES:
         key = self.get_key()
         the_key = [key[(i + j - 1) % self._key_length] for j in range(self._key_length - 1)]
         return "".join(the_key)
-        
+
+    def _get_schedule(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       schedule (tuple): (half, f_tables)
+        Description:  Returns the compact key schedule of the current configuration
+                      half is the number of bits in half a block
+                      f_tables[i] is the output of F for every possible R
+                          in round i+1, i.e. F(R, subkey(i+1)) as integers
+                      The schedule is computed once and reused by all blocks
+                      until p, q, rounds, block_size or an sbox are changed
+                      Schedules are shared by all SDES objects through
+                          _SCHEDULES, keyed by the key, rounds, block_size
+                          and the (interned) sboxes, unless cache is False
+                      At most MAX_CACHED_SCHEDULES are kept (LRUCache)
+        ---------------------------------------------------
+        """
+        if self._schedule is None:
+            cache_key = (self.get_key(), self._rounds, self._block_size, self._sbox1, self._sbox2)
+            schedule = SDES._SCHEDULES.get(cache_key) if self._cache else None
+            if schedule is None:
+                half = self._block_size // 2
+                f_tables = []
+                for i in range(1, self._rounds + 1):
+                    ki = utilities.bin_to_dec(self.get_subkey(i))
+                    f_tables.append(tuple([self.F_int(R, ki, half) for R in range(2 ** half)]))
+                schedule = (half, tuple(f_tables))
+                if self._cache:
+                    SDES._SCHEDULES.put(cache_key, schedule)
+            self._schedule = schedule
+        return self._schedule
+
+    def _reset_key_schedule(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       no return
+        Description:  Drops the cached key, key schedule, codebook and OFB cycles
+                      Called whenever a parameter the key schedule depends on changes
+        ---------------------------------------------------
+        """
+        self._key = None
+        self._schedule = None
+        self._codebook = None
+        self._ofb_positions = {}
+
+    @staticmethod
+    def _crypt_blocks(schedule, blocks, decrypt=False):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   schedule (tuple): output of _get_schedule
+                      blocks (iterable): blocks as integers
+                      decrypt (bool): apply the rounds in reverse order
+        Return:       result (list): processed blocks as integers
+        Description:  Integer Feistel engine
+                      Applies all rounds to every block followed by the final swap
+        ---------------------------------------------------
+        """
+        half, f_tables = schedule
+        mask = (1 << half) - 1
+        if decrypt:
+            f_tables = f_tables[::-1]
+        result = []
+        for b in blocks:
+            L = b >> half
+            R = b & mask
+            for f in f_tables:
+                L, R = R, L ^ f[R]
+            result.append((R << half) | L)
+        return result
+
+    def _get_codebook(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       forward (array): encryption table
+                      inverse (array): decryption table
+        Description:  Returns the codebook of the current configuration
+                      forward[b] is the encryption of block b
+                          i.e. all rounds followed by the final swap
+                      inverse is the inverse permutation of forward
+                      Tables are shared by all SDES objects through _CODEBOOKS
+                          (unless cache is False) and are built once per key schedule
+                      At most MAX_CACHED_CODEBOOKS are kept (LRUCache)
+        ---------------------------------------------------
+        """
+        if self._codebook is None:
+            schedule = self._get_schedule()
+            codebook = SDES._CODEBOOKS.get(schedule) if self._cache else None
+            if codebook is None:
+                forward = array('H', SDES._crypt_blocks(schedule, range(2 ** self._block_size)))
+                inverse = array('H', [0]) * len(forward)
+                for b in range(len(forward)):
+                    inverse[forward[b]] = b
+                codebook = (forward, inverse)
+                if self._cache:
+                    SDES._CODEBOOKS.put(schedule, codebook)
+            self._codebook = codebook
+        return self._codebook
+
+    def encrypt_blocks(self, blocks, mode='ECB', workers=None):
+        """
+        ----------------------------------------------------
+        Parameters:   blocks (list, array or numpy array): blocks as integers
+                          each block is an integer of block_size bits
+                      mode (str): ECB (default), CBC, CTR or OFB
+                      workers (int): #processes, default = None (no processes)
+        Return:       result (numpy array or array): encrypted blocks
+        Description:  Batch encryption of blocks (no encoding or padding)
+                      If numpy is installed, all blocks go through each round
+                          at once and a numpy array of uint16 is returned
+                      Otherwise the integer engine is used and an
+                          array('H') with identical values is returned
+                      CBC and OFB use the same IV as encrypt and are serial
+                      In ECB and CTR modes, if workers > 1 and there are at least
+                          PARALLEL_MIN_BLOCKS blocks, the blocks are split
+                          among a pool of worker processes, which is
+                          started on first use and kept for later calls
+        Errors:       if undefined mode or invalid blocks --> return ''
+        ---------------------------------------------------
+        """
+        return self._crypt_batch(blocks, mode, False, workers)
+
+    def decrypt_blocks(self, blocks, mode='ECB', workers=None):
+        """
+        ----------------------------------------------------
+        Parameters:   blocks (list, array or numpy array): blocks as integers
+                      mode (str): ECB (default), CBC, CTR or OFB
+                      workers (int): #processes, default = None (no processes)
+        Return:       result (numpy array or array): decrypted blocks
+        Description:  Batch decryption of blocks, see encrypt_blocks
+                      Unlike encryption, CBC decryption does not depend on
+                          previous results: all blocks are decrypted at once
+                          (in parallel if workers > 1) and then xored with
+                          the ciphertext shifted by one block (IV first)
+        Errors:       if undefined mode or invalid blocks --> return ''
+        ---------------------------------------------------
+        """
+        return self._crypt_batch(blocks, mode, True, workers)
+
+    def _crypt_batch(self, blocks, mode, decrypt, workers):
+        """
+        ----------------------------------------------------
+        Parameters:   blocks (list, array or numpy array)
+                      mode (str)
+                      decrypt (bool)
+                      workers (int)
+        Return:       result (numpy array or array)
+        Description:  Shared implementation of encrypt_blocks and decrypt_blocks
+        ---------------------------------------------------
+        """
+        if mode not in self.MODES or self._block_size > 16:
+            return ''
+        limit = 2 ** self._block_size
+        if np is not None:
+            data = np.asarray(blocks)
+            if data.ndim != 1 or (data.size and (data.min() < 0 or data.max() >= limit)):
+                return ''
+            data = data.astype(np.uint16)
+        else:
+            data = list(blocks)
+            if data and (min(data) < 0 or max(data) >= limit):
+                return ''
+        iv = utilities.bin_to_dec(self._get_IV())
+        if mode == "OFB" or (mode == "CBC" and not decrypt):
+            result = self._process_blocks([int(b) for b in data], mode, decrypt, iv)[0]
+            return np.array(result, dtype=np.uint16) if np is not None else array('H', result)
+        source = data
+        if mode == "CTR":
+            # the keystream is the encryption of consecutive counters
+            decrypt = False
+            if np is not None:
+                source = ((iv + np.arange(len(data))) % limit).astype(np.uint16)
+            else:
+                source = [(iv + k) % limit for k in range(len(data))]
+        if workers is not None and workers > 1 and len(data) >= self.PARALLEL_MIN_BLOCKS:
+            result = self._crypt_parallel(source, decrypt, workers)
+        elif np is not None:
+            result = self._crypt_numpy(source, decrypt)
+        elif decrypt:
+            result = self._decrypt_blocks(source)
+        else:
+            result = self._encrypt_blocks(source)
+        if np is not None:
+            result = np.asarray(result, dtype=np.uint16)
+            if mode == "CBC" and len(data):
+                result ^= np.concatenate((np.array([iv], dtype=np.uint16), data[:-1]))
+            elif mode == "CTR":
+                result ^= data
+            return result
+        if mode == "CBC":
+            result = [b ^ c for b, c in zip(result, [iv] + data[:-1])]
+        elif mode == "CTR":
+            result = [b ^ k for b, k in zip(data, result)]
+        return array('H', result)
+
+    def _crypt_parallel(self, data, decrypt, workers, chunk_size=None, executor=None):
+        """
+        ----------------------------------------------------
+        Parameters:   data (list, array or numpy array): blocks as integers
+                      decrypt (bool)
+                      workers (int): #processes
+                      chunk_size (int): #blocks per task,
+                          default = None (one chunk per worker)
+                      executor (ProcessPoolExecutor): default = None
+                          (the shared pool of _get_executor)
+        Return:       result (list): processed blocks as integers
+        Description:  Splits the blocks into chunks and processes the chunks
+                      with _crypt_blocks in a ProcessPoolExecutor
+                          (_crypt_blocks_numpy if numpy is installed)
+                      Workers only receive the compact key schedule and
+                          their chunk as an array('H')
+                      The results are joined in the order of the chunks
+        ---------------------------------------------------
+        """
+        if chunk_size is None:
+            chunk_size = math.ceil(len(data) / workers)
+        chunks = [array('H', [int(b) for b in data[i:i + chunk_size]])
+                  for i in range(0, len(data), chunk_size)]
+        if executor is None:
+            executor = SDES._get_executor(workers)
+        engine = SDES._crypt_blocks if np is None else SDES._crypt_blocks_numpy
+        parts = list(executor.map(engine, repeat(self._get_schedule()), chunks, repeat(decrypt)))
+        if np is not None:
+            return np.concatenate(parts).tolist() if parts else []
+        result = []
+        for part in parts:
+            result.extend(part)
+        return result
+
+    @staticmethod
+    def _get_executor(workers):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   workers (int): #processes
+        Return:       executor (ProcessPoolExecutor)
+        Description:  Pool shared by all SDES objects for encrypt_blocks and
+                          decrypt_blocks with workers > 1
+                      Started on first use and kept for the next calls,
+                          a different #workers replaces it
+        ---------------------------------------------------
+        """
+        if SDES._executor is None or SDES._executor_workers != workers:
+            if SDES._executor is not None:
+                SDES._executor.shutdown()
+            SDES._executor = ProcessPoolExecutor(workers)
+            SDES._executor_workers = workers
+        return SDES._executor
+
+    def _crypt_numpy(self, data, decrypt):
+        """
+        ----------------------------------------------------
+        Parameters:   data (numpy array): blocks as uint16
+                      decrypt (bool)
+        Return:       result (numpy array): processed blocks as uint16
+        Description:  Vectorized engine, requires numpy
+                      Every round is one table lookup (fancy indexing) into
+                          the F table of its subkey, see _get_schedule
+        ---------------------------------------------------
+        """
+        if self._engine == "codebook":
+            table = self._get_codebook()[1 if decrypt else 0]
+            return np.frombuffer(table, dtype=np.uint16)[data]
+        return SDES._crypt_blocks_numpy(self._get_schedule(), data, decrypt)
+
+    @staticmethod
+    def _crypt_blocks_numpy(schedule, blocks, decrypt=False):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   schedule (tuple): output of _get_schedule
+                      blocks (numpy array or array): blocks as uint16
+                      decrypt (bool): apply the rounds in reverse order
+        Return:       result (numpy array): processed blocks as uint16
+        Description:  Vectorized version of _crypt_blocks, requires numpy
+        ---------------------------------------------------
+        """
+        half, f_tables = schedule
+        if decrypt:
+            f_tables = f_tables[::-1]
+        data = np.asarray(blocks, dtype=np.uint16)
+        L = data >> half
+        R = data & ((1 << half) - 1)
+        for f in f_tables:
+            L, R = R, L ^ np.array(f, dtype=np.uint16)[R]
+        return (R << half) | L
+
+    def _encrypt_blocks(self, blocks):
+        """
+        ----------------------------------------------------
+        Parameters:   blocks (iterable): blocks as integers
+        Return:       result (list): encrypted blocks as integers
+        Description:  Encrypts blocks independently using the selected engine
+                      Large lists use the numpy engine when available
+        ---------------------------------------------------
+        """
+        if np is not None and len(blocks) >= self.NUMPY_MIN_BLOCKS:
+            return self._crypt_numpy(np.array(blocks, dtype=np.uint16), False).tolist()
+        if self._engine == "codebook":
+            forward = self._get_codebook()[0]
+            return [forward[b] for b in blocks]
+        return SDES._crypt_blocks(self._get_schedule(), blocks)
+
+    def _decrypt_blocks(self, blocks):
+        """
+        ----------------------------------------------------
+        Parameters:   blocks (iterable): blocks as integers
+        Return:       result (list): decrypted blocks as integers
+        Description:  Decrypts blocks independently using the selected engine
+                      Large lists use the numpy engine when available
+        ---------------------------------------------------
+        """
+        if np is not None and len(blocks) >= self.NUMPY_MIN_BLOCKS:
+            return self._crypt_numpy(np.array(blocks, dtype=np.uint16), True).tolist()
+        if self._engine == "codebook":
+            inverse = self._get_codebook()[1]
+            return [inverse[b] for b in blocks]
+        return SDES._crypt_blocks(self._get_schedule(), blocks, True)
+
+    def expand_int(self, R, size=None):
+        """
+        ----------------------------------------------------
+        Parameters:   R (int): binary number of size bits
+                      size (int): #bits of R, default = block_size/2
+        Return:       R_exp (int): output of expand function, size+2 bits
+        Description:  Integer version of expand
+                      If the bits at the two middle indices are i and i+1
+                          R(0)..R(i-1) R(i+1)R(i)R(i+1)R(i) R(i+2)..R(size-1)
+                      Index 0 is the most significant bit
+        ---------------------------------------------------
+        """
+        if size is None:
+            size = self._block_size // 2
+        low_bits = size - size // 2 - 1
+        high = R >> (low_bits + 2)
+        a = (R >> (low_bits + 1)) & 1
+        b = (R >> low_bits) & 1
+        middle = (b << 3) | (a << 2) | (b << 1) | a
+        return (((high << 4) | middle) << low_bits) | (R & ((1 << low_bits) - 1))
+
+    def F_int(self, Ri, ki, size=None):
+        """
+        ----------------------------------------------------
+        Parameters:   Ri (int): binary number of size bits
+                      ki (int): subkey of size+2 bits
+                      size (int): #bits of Ri, default = block_size/2
+        Return:       Ri2 (int): [sbox1][sbox2] output
+        Description:  Integer version of F
+        ---------------------------------------------------
+        """
+        if size is None:
+            size = self._block_size // 2
+        xored = self.expand_int(Ri, size) ^ ki
+        half = (size + 2) // 2
+        most_sig_bits = xored >> half
+        least_sig_bits = xored & ((1 << half) - 1)
+        return (self._sbox1.substitute_int(most_sig_bits) << (self._sbox2.get_size() - 1)) | \
+            self._sbox2.substitute_int(least_sig_bits)
+
+    def feistel_int(self, bi, ki, size=None):
+        """
+        ----------------------------------------------------
+        Parameters:   bi (int): block of size bits
+                      ki (int): subkey of size/2+2 bits
+                      size (int): #bits of bi, default = block_size
+        Return:       bi2 (int): block of size bits
+        Description:  Integer version of feistel
+                      L(current) = R(previous)
+                      R(current) = L(previous) xor F(R(previous), subkey)
+        ---------------------------------------------------
+        """
+        if size is None:
+            size = self._block_size
+        half = size // 2
+        li = bi & ((1 << half) - 1)
+        ri = (bi >> half) ^ self.F_int(li, ki, half)
+        return (li << half) | ri
+
     def expand(self,R):
         """
         ----------------------------------------------------
@@ -364,23 +1543,15 @@ class SDES:
                           middle becomes: R(i+1)R(i)R(i+1)R(i)
                           indices R(i+2) to the end: same order
                       No need to validate that R is of size block_size/2
+                      Wrapper around expand_int
         Errors:       if R is an invalid binary number -->  return ''
         ---------------------------------------------------
         """
         # your code here
-        if not utilities.is_binary(R):
+        if not utilities.is_binary(R) or len(R) < 2:
             return ''
-        mid_idx = (len(R) // 2) - 1
-        R_exp = ""
-        for i in range(mid_idx):
-            R_exp += R[i]
-        R_exp += R[mid_idx + 1]
-        R_exp += R[mid_idx]
-        R_exp += R[mid_idx + 1]
-        R_exp += R[mid_idx]
-        for i in range(mid_idx + 2, len(R)):
-            R_exp += R[i]
-        return R_exp
+        R_exp = self.expand_int(utilities.bin_to_dec(R), len(R))
+        return utilities.dec_to_bin(R_exp, len(R) + 2)
     
     def F(self,Ri,ki):
         """
@@ -395,19 +1566,17 @@ class SDES:
                       4- Pass the most significant bits of [3] to Sbox1
                          and least significant bits to sbox2
                       5- Concatenate the output of [4] as [sbox1][sbox2]
+                      Wrapper around F_int
         Errors:       if ki or Ri is an invalid binary number --> return ''
         ---------------------------------------------------
         """
         # your code here
         if not utilities.is_binary(Ri) or not utilities.is_binary(ki) or len(ki) != len(Ri) + 2:
             return ""
-        R_exp = self.expand(Ri)
-        xored = utilities.xor(R_exp, ki)
-        xored_blocks = [[xored[i] for i in range(len(xored) // 2)], [xored[i] for i in range(len(xored) // 2, len(xored))]]
-        most_sig_bits = "".join(xored_blocks[0])
-        least_sig_bits = "".join(xored_blocks[1])
-        ans = self._sbox1.substitute(most_sig_bits) + self._sbox2.substitute(least_sig_bits)
-        return ans
+        if self._sbox1.is_empty() or self._sbox2.is_empty() or len(ki) != 2 * self._sbox1.get_size():
+            return ""
+        ans = self.F_int(utilities.bin_to_dec(Ri), utilities.bin_to_dec(ki), len(Ri))
+        return utilities.dec_to_bin(ans, self._sbox1.get_size() + self._sbox2.get_size() - 2)
 
     def feistel(self,bi,ki):
         """
@@ -418,17 +1587,17 @@ class SDES:
         Description:  Applies Feistel Cipher on a block of binary numbers
                       L(current) = R(previous)
                       R(current) = L(previous) xor F(R(previous), subkey)
+                      Wrapper around feistel_int
         Errors:       if ki or bi is an invalid binary number --> return ''
         ---------------------------------------------------
         """
         # your code here
         if  (len(bi) / 2) + 2 != len(ki) or not utilities.is_binary(bi) or not utilities.is_binary(ki):
             return ''
-        blocks = [[bi[i] for i in range(len(bi) // 2)],
-                        [bi[i] for i in range(len(bi) // 2, len(bi))]]
-        li = "".join(blocks[1])
-        ri = utilities.xor("".join(blocks[0]), self.F(li, ki))
-        return li + ri
+        if self._sbox1.is_empty() or self._sbox2.is_empty() or len(ki) != 2 * self._sbox1.get_size():
+            return ''
+        ans = self.feistel_int(utilities.bin_to_dec(bi), utilities.bin_to_dec(ki), len(bi))
+        return utilities.dec_to_bin(ans, len(bi))
     
     def encrypt(self,plaintext,mode):
         """
@@ -438,7 +1607,7 @@ class SDES:
         Return:       ciphertext (str)
         Description:  A dispatcher SDES encryption function
                       passes the plaintext to the proper function based on given mode
-                      Works for ECB and CBC modes
+                      Works for ECB, CBC, CTR and OFB modes
         Errors:       if undefined mode --> return ''
         ---------------------------------------------------
         """
@@ -447,6 +1616,10 @@ class SDES:
             return self._encrypt_ECB(plaintext)
         elif mode == "CBC":
             return self._encrypt_CBC(plaintext)
+        elif mode == "CTR":
+            return self._encrypt_CTR(plaintext)
+        elif mode == "OFB":
+            return self._encrypt_OFB(plaintext)
         else:
             return ""
     
@@ -458,7 +1631,7 @@ class SDES:
         Return:       plaintext (str)
         Description:  A dispatcher SDES decryption function
                       passes the ciphertext to the proper function based on given mode
-                      Works for ECB and CBC modes
+                      Works for ECB, CBC, CTR and OFB modes
         Errors:       if undefined mode --> return ''
         ---------------------------------------------------
         """
@@ -467,31 +1640,383 @@ class SDES:
             return self._decrypt_ECB(ciphertext)
         elif mode == "CBC":
             return self._decrypt_CBC(ciphertext)
+        elif mode == "CTR":
+            return self._decrypt_CTR(ciphertext)
+        elif mode == "OFB":
+            return self._decrypt_OFB(ciphertext)
         else:
             return ""
     
+    def decrypt_range(self,ciphertext_source,start,end,mode,index=None):
+        """
+        ----------------------------------------------------
+        Parameters:   ciphertext_source (str/bytes/file): a seekable file
+                          or the ciphertext itself
+                      start (int): first plaintext offset
+                      end (int): plaintext offset after the last character
+                      mode (str): ECB or CTR
+                      index (RangeIndex): index of ciphertext_source,
+                          default = None (count from the beginning)
+        Return:       plaintext (str)
+        Description:  Decrypts the characters start to end-1 of the ciphertext
+                      The output is identical to decrypt(ciphertext, mode)[start:end]
+                      Every plaintext character has the same offset in the
+                          ciphertext, so only the blocks of the window are
+                          read and decrypted, plus the B6 characters that
+                          share a block with its first and last characters
+                      The index gives the #B6 characters before a nearby
+                          offset, without it the ciphertext is read from 0
+                      bytes are mapped one-to-one to characters (latin-1)
+                          binary files are read with seek, text files
+                          are read from the beginning
+        Errors:       if mode is not ECB or CTR, or invalid range --> return ''
+        ---------------------------------------------------
+        """
+        if mode not in ["ECB", "CTR"] or type(start) != int or type(end) != int \
+           or start < 0 or end < start:
+            return ''
+        plaintext, at_end = self._decrypt_window(ciphertext_source, start, end, mode, index)
+        position = end
+        while plaintext.endswith(self._pad) and not at_end:
+            # decrypt only strips the pad characters that end the whole text
+            following, at_end = self._decrypt_window(ciphertext_source, position,
+                                                     position + self.DEFAULT_CHUNK_SIZE, mode, index)
+            if following.rstrip(self._pad) != "":
+                return plaintext
+            position += self.DEFAULT_CHUNK_SIZE
+        return plaintext.rstrip(self._pad)
+
+    def _decrypt_window(self, source, start, end, mode, index):
+        """
+        ----------------------------------------------------
+        Parameters:   source (str/bytes/file)
+                      start (int)
+                      end (int)
+                      mode (str): ECB or CTR
+                      index (RangeIndex/None)
+        Return:       plaintext (str): characters start to end-1, not stripped
+                      at_end (bool): True if source has no characters after end
+        Description:  Decrypts a window of the ciphertext for decrypt_range
+        ---------------------------------------------------
+        """
+        base = utilities.get_base("B6")
+        offset, count = 0, 0
+        if index is not None:
+            offset, count = index.lookup(start)
+        text, at_end = self._read_source(source, offset, end)
+        prefix = utilities.split_passthrough(text[:start - offset], base)[0]
+        count += len(prefix)
+        window, positions = utilities.split_passthrough(text[start - offset:], base)
+        head = prefix[-1:] if count % 2 != 0 else ""
+        while head == "" and count % 2 != 0:
+            # the block starts before the indexed offset
+            lower = max(0, offset - index.get_interval())
+            head = utilities.split_passthrough(self._read_source(source, lower, offset)[0], base)[0][-1:]
+            offset = lower
+        tail = ""
+        position = max(end, start)
+        exhausted = at_end
+        while (len(head) + len(window) + len(tail)) % 2 != 0:
+            if exhausted:
+                tail = self._pad
+                break
+            chunk, exhausted = self._read_source(source, position, position + self.DEFAULT_CHUNK_SIZE)
+            tail = utilities.split_passthrough(chunk, base)[0][:1]
+            position += self.DEFAULT_CHUNK_SIZE
+        previous = None
+        if mode == "CTR":
+            previous = (utilities.bin_to_dec(self._get_IV()) + (count - len(head)) // 2) % 2 ** self._block_size
+        blocks = self._process_blocks(self._text_to_blocks(head + window + tail), mode, True, previous)[0]
+        plain = self._blocks_to_text(blocks)[len(head):len(head) + len(window)]
+        return utilities.insert_positions(plain, positions), at_end
+
+    def _read_source(self, source, start, end):
+        """
+        ----------------------------------------------------
+        Parameters:   source (str/bytes/file)
+                      start (int)
+                      end (int)
+        Return:       text (str): characters start to end-1 of source
+                      at_end (bool): True if source has no characters after text
+        Description:  Reads a range of characters used by decrypt_range
+        ---------------------------------------------------
+        """
+        if isinstance(source, (str, bytes)):
+            text = source[start:end]
+            at_end = end >= len(source)
+        else:
+            if isinstance(source.read(0), bytes):
+                source.seek(start)
+            else:
+                source.seek(0)
+                skipped = 0
+                while skipped < start:
+                    chunk = source.read(min(start - skipped, self.DEFAULT_CHUNK_SIZE))
+                    if not chunk:
+                        break
+                    skipped += len(chunk)
+            text = source.read(end - start + 1)
+            at_end = len(text) <= end - start
+            text = text[:end - start]
+        if isinstance(text, bytes):
+            text = text.decode('latin-1')
+        return text, at_end
+
+    def encrypt_stream(self,reader,writer,mode,chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        ----------------------------------------------------
+        Parameters:   reader (file): object with a read(size) method
+                      writer (file): object with a write(data) method
+                      mode (str)
+                      chunk_size (int): #characters read at a time
+        Return:       success: True/False
+        Description:  Streaming version of encrypt
+                      Reads the plaintext from reader chunk by chunk and
+                      writes the ciphertext to writer in constant memory
+                      The output is identical to encrypt(reader.read(), mode)
+                      Works with text (str) and binary (bytes) streams
+                          bytes are mapped one-to-one to characters (latin-1)
+        Errors:       if undefined mode or invalid chunk_size --> return False
+        ---------------------------------------------------
+        """
+        return self._crypt_stream(reader, writer, mode, chunk_size, False)
+
+    def decrypt_stream(self,reader,writer,mode,chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        ----------------------------------------------------
+        Parameters:   reader (file): object with a read(size) method
+                      writer (file): object with a write(data) method
+                      mode (str)
+                      chunk_size (int): #characters read at a time
+        Return:       success: True/False
+        Description:  Streaming version of decrypt
+                      The output is identical to decrypt(reader.read(), mode)
+        Errors:       if undefined mode or invalid chunk_size --> return False
+        ---------------------------------------------------
+        """
+        return self._crypt_stream(reader, writer, mode, chunk_size, True)
+
+    def _crypt_stream(self, reader, writer, mode, chunk_size, decrypt):
+        """
+        ----------------------------------------------------
+        Parameters:   reader (file)
+                      writer (file)
+                      mode (str)
+                      chunk_size (int)
+                      decrypt (bool)
+        Return:       success: True/False
+        Description:  Shared implementation of encrypt_stream and decrypt_stream
+                      State carried from one chunk to the next:
+                          previous: chaining value of the mode
+                          tail: an unpaired B6 character and the
+                                non-B6 characters that follow it
+                          pads: #pad characters held back while decrypting,
+                                they are dropped if they end the output
+        ---------------------------------------------------
+        """
+        if mode not in self.MODES or type(chunk_size) != int or chunk_size < 1:
+            return False
+        base = utilities.get_base("B6")
+        previous = utilities.bin_to_dec(self._get_IV())
+        tail = ""
+        pads = 0
+        binary = None
+        while True:
+            chunk = reader.read(chunk_size)
+            if not chunk:
+                break
+            if binary is None:
+                binary = isinstance(chunk, bytes)
+            if binary:
+                chunk = chunk.decode('latin-1')
+            text = tail + chunk
+            cleaned_text, positions = utilities.split_passthrough(text, base)
+            tail = ""
+            if len(cleaned_text) % 2 != 0:
+                last = len(text) - 1
+                if positions and positions[-1][1] + len(positions[-1][0]) == len(text):
+                    last = positions[-1][1] - 1
+                text, tail = text[:last], text[last:]
+            output, previous = self._crypt_chunk(text, mode, decrypt, previous)
+            pads = self._write_stream(writer, output, binary, decrypt, pads)
+        if tail != "":
+            output, previous = self._crypt_chunk(tail[0] + self._pad, mode, decrypt, previous)
+            output = output[0] + tail[1:] + output[1]
+            self._write_stream(writer, output, binary, decrypt, pads)
+        return True
+
+    def _crypt_chunk(self, text, mode, decrypt, previous):
+        """
+        ----------------------------------------------------
+        Parameters:   text (str): text with an even number of B6 characters
+                      mode (str)
+                      decrypt (bool)
+                      previous (int): chaining value
+        Return:       output (str): processed text
+                      previous (int): updated chaining value
+        Description:  Encrypts or decrypts B6 characters of text in place
+                      other characters are copied to the same positions
+        ---------------------------------------------------
+        """
+        cleaned_text, positions = utilities.split_passthrough(text, utilities.get_base("B6"))
+        blocks, previous = self._process_blocks(self._text_to_blocks(cleaned_text), mode, decrypt, previous)
+        return utilities.insert_positions(self._blocks_to_text(blocks), positions), previous
+
+    def _write_stream(self, writer, output, binary, decrypt, pads):
+        """
+        ----------------------------------------------------
+        Parameters:   writer (file)
+                      output (str)
+                      binary (bool): write bytes instead of str
+                      decrypt (bool)
+                      pads (int): #pad characters held back so far
+        Return:       pads (int): #pad characters held back after this write
+        Description:  Writes output to writer
+                      When decrypting, trailing pad characters are held back
+                      until a different character follows them
+        ---------------------------------------------------
+        """
+        if decrypt:
+            stripped = output.rstrip(self._pad)
+            if stripped == "":
+                return pads + len(output)
+            held = len(output) - len(stripped)
+            output = self._pad * pads + stripped
+            pads = held
+        if output != "":
+            writer.write(output.encode('latin-1') if binary else output)
+        return pads
+
+    def _process_blocks(self, blocks, mode, decrypt, previous):
+        """
+        ----------------------------------------------------
+        Parameters:   blocks (list): blocks as integers
+                      mode (str): ECB, CBC, CTR or OFB
+                      decrypt (bool)
+                      previous (int): chaining value (IV for the first blocks)
+                          CBC: last ciphertext block
+                          CTR: counter of the next block
+                          OFB: last keystream block
+        Return:       result (list): processed blocks as integers
+                      previous (int): chaining value for the next blocks
+        Description:  Applies the given mode of operation to a list of blocks
+                      Consecutive calls continue the chain of the previous call
+        ---------------------------------------------------
+        """
+        if mode == "ECB":
+            if decrypt:
+                return self._decrypt_blocks(blocks), previous
+            return self._encrypt_blocks(blocks), previous
+        if mode == "CTR":
+            limit = 2 ** self._block_size
+            keystream = self._encrypt_blocks([(previous + k) % limit for k in range(len(blocks))])
+            return [b ^ k for b, k in zip(blocks, keystream)], (previous + len(blocks)) % limit
+        if mode == "OFB":
+            if not blocks:
+                return [], previous
+            keystream = self._get_OFB_keystream(previous, len(blocks))
+            return [b ^ k for b, k in zip(blocks, keystream)], keystream[-1]
+        result = []
+        if decrypt:
+            if blocks:
+                result = [b ^ c for b, c in zip(self._decrypt_blocks(blocks), [previous] + blocks[:-1])]
+                previous = blocks[-1]
+        else:
+            for b in blocks:
+                previous = self._encrypt_blocks([b ^ previous])[0]
+                result.append(previous)
+        return result, previous
+
+    def _get_OFB_keystream(self, previous, n):
+        """
+        ----------------------------------------------------
+        Parameters:   previous (int): last keystream block (or IV)
+                      n (int): #keystream blocks
+        Return:       keystream (list): the n blocks that follow previous
+        Description:  OFB keystream, i.e. repeated encryption of previous
+                      Since encryption is a permutation of the blocks, the
+                          keystream is a cycle of at most 2^block_size blocks
+                      Every cycle is computed once per key schedule and
+                          cached in _OFB_CYCLES, so the keystream of any
+                          (key, IV) pair is sliced from a cached cycle
+                      Cycles of at most MAX_CACHED_OFB_CYCLES key schedules
+                          are kept (LRUCache)
+                      If cache is False, the cycles are kept by this object
+                          until the key schedule changes
+        ---------------------------------------------------
+        """
+        if self._cache:
+            positions = SDES._OFB_CYCLES.get(self._get_schedule())
+            if positions is None:
+                positions = {}
+                SDES._OFB_CYCLES.put(self._get_schedule(), positions)
+        else:
+            positions = self._ofb_positions
+        if previous not in positions:
+            cycle = []
+            block = previous
+            while True:
+                block = self._encrypt_blocks([block])[0]
+                cycle.append(block)
+                if block == previous:
+                    break
+            for i in range(len(cycle)):
+                positions[cycle[i]] = (cycle, i)
+        cycle, i = positions[previous]
+        start = (i + 1) % len(cycle)
+        rotated = cycle[start:] + cycle[:start]
+        return rotated * (n // len(cycle)) + rotated[:n % len(cycle)]
+
+    def _crypt_text(self, text, mode, decrypt):
+        """
+        ----------------------------------------------------
+        Parameters:   text (str)
+                      mode (str)
+                      decrypt (bool)
+        Return:       output (str)
+        Description:  Encrypts or decrypts a whole text using the given mode
+                      Pads the B6 characters to an even number using _pad
+                      When decrypting, trailing pad characters are removed
+        ---------------------------------------------------
+        """
+        if len(utilities.split_passthrough(text, utilities.get_base("B6"))[0]) % 2 != 0:
+            text += self._pad
+        output = self._crypt_chunk(text, mode, decrypt, utilities.bin_to_dec(self._get_IV()))[0]
+        if decrypt:
+            output = output.rstrip(self._pad)
+        return output
+
+    def _text_to_blocks(self, text):
+        """
+        ----------------------------------------------------
+        Parameters:   text (str): B6 text of even length
+        Return:       blocks (list): blocks as integers
+        Description:  Encodes every two characters of text into one block
+        ---------------------------------------------------
+        """
+        codes = utilities.encode_B6_text(text)
+        return [(first_one << 6) | second_one for first_one, second_one in zip(codes[0::2], codes[1::2])]
+
+    def _blocks_to_text(self, blocks):
+        """
+        ----------------------------------------------------
+        Parameters:   blocks (list): blocks as integers
+        Return:       text (str): B6 text
+        Description:  Decodes every block into two B6 characters
+        ---------------------------------------------------
+        """
+        codes = bytearray(2 * len(blocks))
+        codes[0::2] = bytes([b >> 6 for b in blocks])
+        codes[1::2] = bytes([b & 63 for b in blocks])
+        return utilities.decode_B6_codes(codes)
+
     def _encrypt_ECB(self,plaintext):
         # your code here
-        ciphertext = ""
-        last_cipher = ""
-        base = utilities.get_base("B6")
-        not_in_base = [i for i in plaintext if i not in base]
-        not_in_base = "".join(not_in_base)
-        positions = utilities.get_positions(plaintext, not_in_base)
-        cleaned_text = utilities.clean_text(plaintext, not_in_base)
+        cleaned_text, positions = utilities.split_passthrough(plaintext, utilities.get_base("B6"))
         if len(cleaned_text) % 2 != 0:
             cleaned_text += self._pad
-        for i in range(0, len(cleaned_text) - 1, 2):
-            first_one = utilities.encode(cleaned_text[i], "B6")
-            second_one = utilities.encode(cleaned_text[i + 1], "B6")
-            ans = first_one + second_one
-            for i in range(self._rounds):
-                ans = self.feistel(ans, self.get_subkey(i + 1))
-            ans = ans[len(ans) // 2::] + ans[0:len(ans) // 2]
-            ciphertext += ans
-        for i in range(0, len(ciphertext), 6):
-            # print(f"bobo --> {i}, {i + 6}")
-            last_cipher += utilities.decode(ciphertext[i: i + 6], "B6")
+        blocks = self._process_blocks(self._text_to_blocks(cleaned_text), "ECB", False, None)[0]
+        last_cipher = self._blocks_to_text(blocks)
         final = utilities.insert_positions(last_cipher, positions)
         return final
     
@@ -504,31 +2029,13 @@ class SDES:
         ---------------------------------------------------
         """
         # your code here
-        plaintext = ""
-        last_plain = ""
-        base = utilities.get_base("B6")
-        not_in_base = [i for i in ciphertext if i not in base]
-        not_in_base = "".join(not_in_base)
-        positions = utilities.get_positions(ciphertext, not_in_base)
-        cleaned_text = utilities.clean_text(ciphertext, not_in_base)
+        cleaned_text, positions = utilities.split_passthrough(ciphertext, utilities.get_base("B6"))
         if len(cleaned_text) % 2 != 0:
             cleaned_text += self._pad
-        for i in range(0, len(cleaned_text) - 1, 2):
-            first_one = utilities.encode(cleaned_text[i], "B6")
-            second_one = utilities.encode(cleaned_text[i + 1], "B6")
-            ans = first_one + second_one
-            for i in range(self._rounds, 0, -1):
-                ans = self.feistel(ans, self.get_subkey(i))
-            ans = ans[len(ans) // 2::] + ans[0:len(ans) // 2]
-            plaintext += ans
-        for i in range(0, len(plaintext), 6):
-            # print(f"bobo --> {i}, {i + 6}")
-            last_plain += utilities.decode(plaintext[i: i + 6], "B6")
+        blocks = self._process_blocks(self._text_to_blocks(cleaned_text), "ECB", True, None)[0]
+        last_plain = self._blocks_to_text(blocks)
         final = utilities.insert_positions(last_plain, positions)
-        to_ = len(final) - 1
-        while final[to_] == self._pad:
-            to_ -= 1
-        return final[0:to_ + 1]
+        return final.rstrip(self._pad)
 
     def _encrypt_CBC(self,plaintext):
         """
@@ -539,38 +2046,64 @@ class SDES:
         ---------------------------------------------------
         """ 
         # your code here
-        ciphertext = ""
-        last_cipher = ""
-        base = utilities.get_base("B6")
-        not_in_base = [i for i in plaintext if i not in base]
-        not_in_base = "".join(not_in_base)
-        positions = utilities.get_positions(plaintext, not_in_base)
-        cleaned_text = utilities.clean_text(plaintext, not_in_base)
-        previous_c = self._get_IV()
+        cleaned_text, positions = utilities.split_passthrough(plaintext, utilities.get_base("B6"))
+        previous_c = utilities.bin_to_dec(self._get_IV())
         if len(cleaned_text) % 2 != 0:
             cleaned_text += self._pad
-        for i in range(0, len(cleaned_text) - 1, 2):
-            first_one = utilities.encode(cleaned_text[i], "B6")
-            second_one = utilities.encode(cleaned_text[i + 1], "B6")
-            ans = first_one + second_one
-            xored_input = utilities.xor(ans, previous_c)
-            for i in range(self._rounds):
-                xored_input = self.feistel(xored_input, self.get_subkey(i + 1))
-            xored_input = xored_input[len(xored_input) // 2::] + xored_input[0:len(xored_input) // 2]
-            ciphertext += xored_input
-            previous_c = xored_input
-        for i in range(0, len(ciphertext), 6):
-            # print(f"bobo --> {i}, {i + 6}")
-            last_cipher += utilities.decode(ciphertext[i: i + 6], "B6")
+        blocks = self._process_blocks(self._text_to_blocks(cleaned_text), "CBC", False, previous_c)[0]
+        last_cipher = self._blocks_to_text(blocks)
         final = utilities.insert_positions(last_cipher, positions)
         return final
 
+    def _encrypt_CTR(self,plaintext):
+        """
+        ----------------------------------------------------
+        Parameters:   plaintext (str)
+        Return:       ciphertext (str)
+        Description:  SDES encryption using CTR mode
+                      block i is xored with the encryption of (IV + i)
+        ---------------------------------------------------
+        """
+        return self._crypt_text(plaintext, "CTR", False)
+
+    def _decrypt_CTR(self,ciphertext):
+        """
+        ----------------------------------------------------
+        Parameters:   ciphertext (str)
+        Return:       plaintext (str)
+        Description:  SDES decryption using CTR mode
+        ---------------------------------------------------
+        """
+        return self._crypt_text(ciphertext, "CTR", True)
+
+    def _encrypt_OFB(self,plaintext):
+        """
+        ----------------------------------------------------
+        Parameters:   plaintext (str)
+        Return:       ciphertext (str)
+        Description:  SDES encryption using OFB mode
+                      block i is xored with the ith encryption of the IV
+        ---------------------------------------------------
+        """
+        return self._crypt_text(plaintext, "OFB", False)
+
+    def _decrypt_OFB(self,ciphertext):
+        """
+        ----------------------------------------------------
+        Parameters:   ciphertext (str)
+        Return:       plaintext (str)
+        Description:  SDES decryption using OFB mode
+        ---------------------------------------------------
+        """
+        return self._crypt_text(ciphertext, "OFB", True)
+
     def _get_IV(self):
         """
         ----------------------------------------------------
         Parameters:   -
         Return:       iv (str): binary number
         Description:  prepares an IV for CBC and OFB modes
+                      and the initial counter for CTR mode
                       the IV length is the same as the block size
                       the IV is a stream of bits that follow the following pattern:
                       1 00 111 0000 11111 ...
@@ -594,37 +2127,468 @@ class SDES:
         ---------------------------------------------------
         """     
         # your code here
-        plaintext = ""
-        last_plain = ""
-        base = utilities.get_base("B6")
-        not_in_base = [i for i in ciphertext if i not in base]
-        not_in_base = "".join(not_in_base)
-        positions = utilities.get_positions(ciphertext, not_in_base)
-        cleaned_text = utilities.clean_text(ciphertext, not_in_base)
-        previous_c = self._get_IV()
+        cleaned_text, positions = utilities.split_passthrough(ciphertext, utilities.get_base("B6"))
+        previous_c = utilities.bin_to_dec(self._get_IV())
         if len(cleaned_text) % 2 != 0:
             cleaned_text += self._pad
-        for i in range(0, len(cleaned_text) - 1, 2):
-            first_one = utilities.encode(cleaned_text[i], "B6")
-            second_one = utilities.encode(cleaned_text[i + 1], "B6")
-            ans = first_one + second_one
-            for i in range(self._rounds, 0, -1):
-                ans = self.feistel(ans, self.get_subkey(i))
-            ans = ans[len(ans) // 2::] + ans[0:len(ans) // 2]
-            xored_input = utilities.xor(ans, previous_c)
-            plaintext += xored_input
-            previous_c = first_one + second_one
-        for i in range(0, len(plaintext), 6):
-            # print(f"bobo --> {i}, {i + 6}")
-            last_plain += utilities.decode(plaintext[i: i + 6], "B6")
+        blocks = self._process_blocks(self._text_to_blocks(cleaned_text), "CBC", True, previous_c)[0]
+        last_plain = self._blocks_to_text(blocks)
         final = utilities.insert_positions(last_plain, positions)
-        to_ = len(final) - 1
-        while final[to_] == self._pad:
-            to_ -= 1
-        return final[0:to_ + 1]
+        return final.rstrip(self._pad)
+
+class ParallelSDES(SDES):
+    """
+    ----------------------------------------------------
+    Description: SDES that spreads blocks over a pool of worker processes
+                 Drop-in replacement of SDES, e.g. encrypt(text, 'ECB')
+                     gives the same ciphertext as SDES
+                 Blocks that are processed independently are split into
+                     chunks for the workers: ECB, the CTR keystream and
+                     CBC decryption
+                 Inputs smaller than PARALLEL_MIN_BLOCKS blocks stay in
+                     this process
+                 use_numpy (default True) also keeps all inputs in this
+                     process when numpy is installed, its vectorized
+                     engine is faster than the workers
+                     with use_numpy False the pool is always used and the
+                     workers run the numpy engine on their chunks
+                 The pool is started on first use and kept until close()
+    ----------------------------------------------------
+    """
+    MIN_CHUNK_BLOCKS = 8192
+    CHUNKS_PER_WORKER = 4
+
+    def __init__(self, workers=None, use_numpy=True):
+        """
+        ----------------------------------------------------
+        Parameters:   _workers (int): #processes, default = #CPUs
+                      _use_numpy (bool): keep inputs in this process
+                          when numpy is installed, default = True
+                      _executor (ProcessPoolExecutor): the pool
+        Description:  Constructs a ParallelSDES object
+                      All SDES parameters are set to default values
+        ---------------------------------------------------
+        """
+        super().__init__()
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self._workers = workers
+        self._use_numpy = use_numpy
+        self._executor = None
+
+    def __enter__(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       self (ParallelSDES)
+        Description:  Context manager support, e.g.
+                      with ParallelSDES(4) as sdes: ...
+        ---------------------------------------------------
+        """
+        return self
+
+    def __exit__(self, *args):
+        """
+        ----------------------------------------------------
+        Parameters:   args: exception type, value and traceback (if any)
+        Return:       False (exceptions are not suppressed)
+        Description:  Closes the pool of workers when the with block ends
+        ---------------------------------------------------
+        """
+        self.close()
+        return False
+
+    def get_value(self,parameter):
+        """
+        ----------------------------------------------------
+        Parameters:   parameter (str)
+        Return:       value (?)
+        Description:  Same as SDES.get_value, also accepts workers
+                      and use_numpy
+        ---------------------------------------------------
+        """
+        if parameter == "workers":
+            return self._workers
+        if parameter == "use_numpy":
+            return self._use_numpy
+        return super().get_value(parameter)
+
+    def set_parameter(self,parameter,value):
+        """
+        ----------------------------------------------------
+        Parameters:   parameter (str)
+                      value (?)
+        Return:       success: True/False
+        Description:  Same as SDES.set_parameter, also accepts workers
+                      and use_numpy
+                      workers should be a positive integer
+                          changing it closes the current pool
+                      use_numpy should be True or False
+        ---------------------------------------------------
+        """
+        if parameter == "workers":
+            if type(value) != int or value < 1:
+                return False
+            if value != self._workers:
+                self.close()
+                self._workers = value
+            return True
+        if parameter == "use_numpy":
+            if type(value) != bool:
+                return False
+            self._use_numpy = value
+            return True
+        return super().set_parameter(parameter, value)
+
+    def close(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       no return
+        Description:  Shuts down the pool of workers (if started)
+        ---------------------------------------------------
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        return None
+
+    def _get_chunk_size(self, n):
+        """
+        ----------------------------------------------------
+        Parameters:   n (int): #blocks
+        Return:       chunk_size (int): #blocks per task
+        Description:  About CHUNKS_PER_WORKER chunks for every worker, so that
+                      workers finishing early pick up more work, but not
+                      less than MIN_CHUNK_BLOCKS blocks per chunk
+        ---------------------------------------------------
+        """
+        return max(self.MIN_CHUNK_BLOCKS, math.ceil(n / (self._workers * self.CHUNKS_PER_WORKER)))
+
+    def _crypt_pool(self, blocks, decrypt):
+        """
+        ----------------------------------------------------
+        Parameters:   blocks (list): blocks as integers
+                      decrypt (bool)
+        Return:       result (list): processed blocks as integers,
+                          None if the blocks should stay in this process
+        ---------------------------------------------------
+        """
+        if (np is not None and self._use_numpy) or self._workers < 2 or len(blocks) < self.PARALLEL_MIN_BLOCKS:
+            return None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self._workers)
+        return self._crypt_parallel(blocks, decrypt, self._workers, self._get_chunk_size(len(blocks)),
+                                    self._executor)
+
+    def _encrypt_blocks(self, blocks):
+        """
+        ----------------------------------------------------
+        Parameters:   blocks (iterable): blocks as integers
+        Return:       result (list): encrypted blocks as integers
+        Description:  Same as SDES._encrypt_blocks, large lists are
+                      processed by the pool of workers
+        ---------------------------------------------------
+        """
+        result = self._crypt_pool(blocks, False)
+        if result is None:
+            result = super()._encrypt_blocks(blocks)
+        return result
+
+    def _decrypt_blocks(self, blocks):
+        """
+        ----------------------------------------------------
+        Parameters:   blocks (iterable): blocks as integers
+        Return:       result (list): decrypted blocks as integers
+        Description:  Same as SDES._decrypt_blocks, large lists are
+                      processed by the pool of workers
+        ---------------------------------------------------
+        """
+        result = self._crypt_pool(blocks, True)
+        if result is None:
+            result = super()._decrypt_blocks(blocks)
+        return result
 
 '______________________________________________________________'
 
+class RangeIndex:
+    """
+    ----------------------------------------------------
+    Description: Sidecar index of a ciphertext used by SDES.decrypt_range
+                 Stores the #B6 characters before every offset that is a
+                     multiple of interval
+                 For an offset with count B6 characters before it:
+                     block index = count // 2
+                     #passthrough characters = offset - count
+                 The file format is little-endian 8-byte integers:
+                     interval, length, then one count per checkpoint
+    ----------------------------------------------------
+    """
+    DEFAULT_INTERVAL = 65536
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        """
+        ----------------------------------------------------
+        Parameters:   _interval (int): #characters between checkpoints
+                      _length (int): #characters of the indexed ciphertext
+                      _counts (array): #B6 characters before each checkpoint
+        Description:  Creates an empty index
+        ---------------------------------------------------
+        """
+        self._interval = interval
+        self._length = 0
+        self._counts = array('Q', [0])
+
+    def get_interval(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       interval (int)
+        ---------------------------------------------------
+        """
+        return self._interval
+
+    def get_length(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       length (int): #characters of the indexed ciphertext
+        ---------------------------------------------------
+        """
+        return self._length
+
+    def build(self, source):
+        """
+        ----------------------------------------------------
+        Parameters:   source (str/bytes/file): ciphertext or a file
+                          with a read(size) method
+        Return:       no return
+        Description:  Indexes source, reading interval characters at a time
+        ---------------------------------------------------
+        """
+        base = utilities.get_base("B6")
+        self._length = 0
+        self._counts = array('Q', [0])
+        position = 0
+        while True:
+            if isinstance(source, (str, bytes)):
+                chunk = source[position:position + self._interval]
+                position += self._interval
+            else:
+                chunk = source.read(self._interval)
+            if isinstance(chunk, bytes):
+                chunk = chunk.decode('latin-1')
+            self._length += len(chunk)
+            if len(chunk) < self._interval:
+                break
+            self._counts.append(self._counts[-1] + len(utilities.split_passthrough(chunk, base)[0]))
+        return None
+
+    def lookup(self, offset):
+        """
+        ----------------------------------------------------
+        Parameters:   offset (int)
+        Return:       checkpoint (int): largest indexed offset <= offset
+                      count (int): #B6 characters before checkpoint
+        ---------------------------------------------------
+        """
+        i = min(offset // self._interval, len(self._counts) - 1)
+        return i * self._interval, self._counts[i]
+
+    def save(self, filename):
+        """
+        ----------------------------------------------------
+        Parameters:   filename (str)
+        Return:       no return
+        Description:  Writes the index to a binary file
+        ---------------------------------------------------
+        """
+        counts = array('Q', [self._interval, self._length]) + self._counts
+        if struct.pack('=Q', 1) != struct.pack('<Q', 1):
+            counts.byteswap()
+        with open(filename, 'wb') as f:
+            f.write(counts.tobytes())
+        return None
+
+    @staticmethod
+    def load(filename):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   filename (str)
+        Return:       index (RangeIndex)
+        Description:  Reads an index written by save
+        Errors:       if the file does not exist or is not an index, return:
+                        'Error(RangeIndex.load): invalid file'
+        ---------------------------------------------------
+        """
+        if not os.path.isfile(filename) or os.path.getsize(filename) < 24 \
+           or os.path.getsize(filename) % 8 != 0:
+            return 'Error(RangeIndex.load): invalid file'
+        counts = array('Q')
+        with open(filename, 'rb') as f:
+            counts.frombytes(f.read())
+        if struct.pack('=Q', 1) != struct.pack('<Q', 1):
+            counts.byteswap()
+        if counts[0] < 1:
+            return 'Error(RangeIndex.load): invalid file'
+        index = RangeIndex(counts[0])
+        index._length = counts[1]
+        index._counts = counts[2:]
+        return index
+
+class Cryptanalysis:
+    """
+    ----------------------------------------------------
+    Description: Brute force key search for SDES
+                 The key has only key_length bits, so every raw key is tried
+                     directly instead of searching p and q for BBS
+                 Only a prefix of the ciphertext is decrypted per key and most
+                     keys are rejected by a quick character check, before the
+                     remaining ones are scored with the dictionary
+    ----------------------------------------------------
+    """
+    PREFIX_SIZE = 64
+    QUICK_RATIO = 0.8
+    PARAMETERS = ['rounds', 'block_size', 'sbox1', 'sbox2', 'pad']
+
+    @staticmethod
+    def get_keys(key_length=SDES.DEFAULT_KEY_LENGTH):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   key_length (int): default = SDES.DEFAULT_KEY_LENGTH
+        Return:       keys (list): all binary numbers of key_length bits
+        ---------------------------------------------------
+        """
+        return [utilities.dec_to_bin(k, key_length) for k in range(2 ** key_length)]
+
+    @staticmethod
+    def set_key(sdes, key):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   sdes (SDES)
+                      key (str): binary number of key_length bits
+        Return:       success: True/False
+        Description:  Sets the key of sdes without using BBS, see SDES.set_key
+        ---------------------------------------------------
+        """
+        return sdes.set_key(key)
+
+    @staticmethod
+    def brute_force(ciphertext, mode, dict_list, sdes=None, threshold=0.9, prefix_size=PREFIX_SIZE, workers=None):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   ciphertext (str)
+                      mode (str)
+                      dict_list (list or Dictionary): dictionary list
+                      sdes (SDES): parameters other than the key (rounds, sboxes, pad)
+                          default = None (default parameters)
+                      threshold (float): passed to utilities.is_plaintext
+                      prefix_size (int): #ciphertext characters to decrypt
+                      workers (int): #processes, default = None (no processes)
+        Return:       candidates (list): [key, score, plaintext] for every key
+                          whose plaintext passes is_plaintext, sorted by score
+                          score is #matches/#words from analyze_text
+                          plaintext is the decrypted prefix
+        Description:  Tries every key on the first prefix_size characters
+                      If workers > 1, the keys are split among worker processes
+                          each worker decrypts with its own SDES object
+                      If the prefix is shorter than the ciphertext, its last
+                          (possibly cut) word is not scored
+        Errors:       if undefined mode --> return []
+        ---------------------------------------------------
+        """
+        if mode not in SDES.MODES:
+            return []
+        if sdes is None:
+            sdes = SDES()
+        parameters = [sdes.get_value(parameter) for parameter in Cryptanalysis.PARAMETERS]
+        keys = Cryptanalysis.get_keys(int(sdes.get_value('key_length')))
+        prefix = ciphertext[:prefix_size]
+        if workers is None or workers < 2:
+            plaintexts = Cryptanalysis._try_keys(keys, prefix, mode, parameters)
+        else:
+            size = math.ceil(len(keys) / workers)
+            chunks = [keys[i:i + size] for i in range(0, len(keys), size)]
+            plaintexts = []
+            with ProcessPoolExecutor(workers) as executor:
+                for part in executor.map(Cryptanalysis._try_keys, chunks, repeat(prefix),
+                                         repeat(mode), repeat(parameters)):
+                    plaintexts.extend(part)
+        candidates = []
+        for key, plaintext in plaintexts:
+            if len(prefix) < len(ciphertext) and ' ' in plaintext:
+                plaintext = plaintext[:plaintext.rindex(' ')]
+            if utilities.is_plaintext(plaintext, dict_list, threshold):
+                matches, mismatches = utilities.analyze_text(plaintext, dict_list)
+                candidates.append([key, matches / (matches + mismatches), plaintext])
+        candidates.sort(key=lambda candidate: candidate[1], reverse=True)
+        return candidates
+
+    @staticmethod
+    def _try_keys(keys, prefix, mode, parameters):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   keys (list): binary numbers
+                      prefix (str): ciphertext
+                      mode (str)
+                      parameters (list): values of PARAMETERS
+        Return:       plaintexts (list): [key, plaintext] for keys that
+                          pass _is_candidate
+        Description:  Decrypts the prefix with every key
+                      The key schedule of every key is computed once and
+                          is not added to the caches shared by SDES objects
+        ---------------------------------------------------
+        """
+        sdes = SDES()
+        for parameter, value in zip(Cryptanalysis.PARAMETERS, parameters):
+            sdes.set_parameter(parameter, value)
+        sdes.set_parameter('cache', False)
+        plaintexts = []
+        for key in keys:
+            sdes.set_key(key)
+            plaintext = sdes._crypt_text(prefix, mode, True)
+            if Cryptanalysis._is_candidate(plaintext):
+                plaintexts.append([key, plaintext])
+        return plaintexts
+
+    @staticmethod
+    def _is_candidate(text):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   text (str)
+        Return:       True/False
+        Description:  Quick check before the dictionary check
+                      At least QUICK_RATIO of the B6 characters of text should
+                          be lower case letters, spaces and periods
+                          (or upper case letters, spaces and periods)
+                      A wrong key gives random B6 characters, less than half
+                          of them are lower case letters, spaces or periods
+                      Stops as soon as the ratio cannot be reached
+        ---------------------------------------------------
+        """
+        base = utilities.get_base("B6")
+        n = len(utilities.split_passthrough(text, base)[0])
+        if n == 0:
+            return False
+        budget = n - Cryptanalysis.QUICK_RATIO * n
+        lower_misses = 0
+        upper_misses = 0
+        for c in text:
+            if c in base and c not in ' .':
+                if not c.islower():
+                    lower_misses += 1
+                if not c.isupper():
+                    upper_misses += 1
+                if lower_misses > budget and upper_misses > budget:
+                    return False
+        return True
+
 # put your mode class here
 
 class MOD:
@@ -633,6 +2597,13 @@ class MOD:
     Description: Some utility functions for modular arithmetic
     ----------------------------------------------------
     """
+    SMALL_PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47,
+                    53, 59, 61, 67, 71, 73, 79, 83, 89, 97)
+    # Miller-Rabin bases that are deterministic for all n < 3.3 * 10^24
+    WITNESSES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+    MAX_CACHED_SEGMENTS = 64
+    _segments = {}
+
     @staticmethod
     def is_prime(n):
         """
@@ -641,19 +2612,87 @@ class MOD:
         Parameters:   n (int): an arbitrary integer
         Return:       True/False
         Description:  Check if the given input is a prime number
-                      Search Online for an efficient implementation
+                      Trial division by SMALL_PRIMES, followed by
+                      Miller-Rabin with the bases in WITNESSES
+                      The result is exact for every 64-bit integer
+                      (larger inputs are strong probable primes)
         ---------------------------------------------------
         """
         # your code here
-        if n <= 1:
+        if type(n) != int or n <= 1:
             return False
-        if n == 2:
+        for p in MOD.SMALL_PRIMES:
+            if n % p == 0:
+                return n == p
+        if n < MOD.SMALL_PRIMES[-1] ** 2:
             return True
-        for i in range(2, math.ceil(math.sqrt(n)) + 1):
-            if n % i == 0:
+        d = n - 1
+        s = 0
+        while d % 2 == 0:
+            d //= 2
+            s += 1
+        for a in MOD.WITNESSES:
+            x = pow(a, d, n)
+            if x == 1 or x == n - 1:
+                continue
+            for _ in range(s - 1):
+                x = x * x % n
+                if x == n - 1:
+                    break
+            else:
                 return False
         return True
 
+    @staticmethod
+    def primes_in_range(a,b):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   a (int): start of range (inclusive)
+                      b (int): end of range (exclusive)
+        Return:       primes (list): all primes p such that a <= p < b
+        Description:  Range query on top of PrimeTable.sieve
+                      The range is split into segments aligned to
+                          PrimeTable.SEGMENT_SIZE, every sieved segment is cached
+                          (up to MAX_CACHED_SEGMENTS, oldest dropped first)
+        Errors:       if a or b are not integers, return:
+                        'Error(MOD.primes_in_range): invalid input'
+        ---------------------------------------------------
+        """
+        if type(a) != int or type(b) != int:
+            return 'Error(MOD.primes_in_range): invalid input'
+        size = PrimeTable.SEGMENT_SIZE
+        primes = []
+        for low in range(max(a, 0) // size * size, max(b, 0), size):
+            segment = MOD._segments.get(low)
+            if segment is None:
+                segment = array('Q', PrimeTable.sieve(low, low + size))
+                if len(MOD._segments) >= MOD.MAX_CACHED_SEGMENTS:
+                    del MOD._segments[next(iter(MOD._segments))]
+                MOD._segments[low] = segment
+            if low >= a and low + size <= b:
+                primes.extend(segment)
+            else:
+                primes.extend([p for p in segment if a <= p < b])
+        return primes
+
+    @staticmethod
+    def blum_primes(a,b):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   a (int): start of range (inclusive)
+                      b (int): end of range (exclusive)
+        Return:       primes (list): all primes p = 3 mod 4 such that a <= p < b
+        Description:  Primes that are valid p and q values for BBS
+        Errors:       if a or b are not integers, return:
+                        'Error(MOD.blum_primes): invalid input'
+        ---------------------------------------------------
+        """
+        if type(a) != int or type(b) != int:
+            return 'Error(MOD.blum_primes): invalid input'
+        return [p for p in MOD.primes_in_range(a, b) if p % 4 == 3]
+
     @staticmethod
     def gcd(a,b):
         """
@@ -745,12 +2784,12 @@ class MOD:
         ---------------------------------------------------
         """
         # your code here
-        if a == 0 or b == 0:
+        if type(a) != int or type(b) != int or a == 0 or b == 0:
             return 'Error(MOD.EEA): invalid input'
         u = [abs(a), 1, 0]
         v = [abs(b), 0, 1]
         while v[0] != 0:
-            q = math.floor(u[0] / v[0])
+            q = u[0] // v[0]
             r = [u[0] - q * v[0], u[1] - q * v[1], u[2] - q * v[2]]
             u = v
             v = r
@@ -783,6 +2822,112 @@ class MOD:
             return "NA"
         return res[2] % a
 
+    @staticmethod
+    def _to_ints(values):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   values (int or iterable): integer(s), e.g. list, array
+                          or numpy array
+        Return:       values (list): Python integers, None if a value is not
+                          an integer
+        ---------------------------------------------------
+        """
+        if type(values) == int:
+            return [values]
+        try:
+            return [operator.index(v) for v in values]
+        except TypeError:
+            return None
+
+    @staticmethod
+    def gcd_many(a,b):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   a (list): integers (list, array, ...)
+                      b (int or list): one integer for all a, or one per a
+        Return:       result (list): gcd(a[i], b[i]) for every i
+        Description:  Batch version of gcd, with the same results
+                      Pairs with a 0 get 'Error(MOD.gcd): invalid input'
+        Errors:       if a or b are not integers, or of different lengths:
+                        'Error(MOD.gcd_many): invalid input'
+        ---------------------------------------------------
+        """
+        a = MOD._to_ints(a)
+        multiple = type(b) != int
+        b = MOD._to_ints(b)
+        if a is None or b is None or (multiple and len(a) != len(b)):
+            return 'Error(MOD.gcd_many): invalid input'
+        if not multiple:
+            b = b * len(a)
+        return [math.gcd(x, y) if x != 0 and y != 0 else 'Error(MOD.gcd): invalid input'
+                for x, y in zip(a, b)]
+
+    @staticmethod
+    def mul_inv_many(a,m):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   a (list): integers (list, array, ...)
+                      m (int): modulus > 1
+        Return:       result (list): multiplicative inverse of a[i] mod m,
+                          or 'NA' if it does not exist
+        Description:  Montgomery's batch inversion:
+                          the products a[0]*...*a[i] mod m are inverted with
+                          a single EEA, the inverse of every a[i] is then
+                          recovered with two multiplications
+                      Values without an inverse are left out of the products
+        Errors:       if a is not a list of integers or m is not an integer > 1:
+                        'Error(MOD.mul_inv_many): invalid input'
+        ---------------------------------------------------
+        """
+        a = MOD._to_ints(a)
+        if a is None or type(m) != int or m < 2:
+            return 'Error(MOD.mul_inv_many): invalid input'
+        values = [x % m for x in a]
+        invertible = [x != 0 and math.gcd(x, m) == 1 for x in values]
+        prefix = []
+        product = 1
+        for x, valid in zip(values, invertible):
+            if valid:
+                product = product * x % m
+            prefix.append(product)
+        inverse = MOD.EEA(m, product)[2] % m
+        result = ['NA'] * len(values)
+        for i in range(len(values) - 1, -1, -1):
+            if invertible[i]:
+                before = prefix[i - 1] if i > 0 else 1
+                result[i] = inverse * before % m
+                inverse = inverse * values[i] % m
+        return result
 
-sb = SBOX()
-sb.set_box('sbox1.txt')
+    @staticmethod
+    def pow_many(a,e,m):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   a (list): bases (list, array, ...)
+                      e (int or list): one exponent for all a, or one per a
+                      m (int): modulus > 0
+        Return:       result (list): a[i]^e[i] mod m
+                          negative exponents use the multiplicative inverse,
+                          'NA' if it does not exist
+        Errors:       if inputs are not integers, or of different lengths, or m < 1:
+                        'Error(MOD.pow_many): invalid input'
+        ---------------------------------------------------
+        """
+        a = MOD._to_ints(a)
+        multiple = type(e) != int
+        e = MOD._to_ints(e)
+        if a is None or e is None or (multiple and len(a) != len(e)) or type(m) != int or m < 1:
+            return 'Error(MOD.pow_many): invalid input'
+        if not multiple:
+            e = e * len(a)
+        result = []
+        for x, y in zip(a, e):
+            try:
+                result.append(pow(x, y, m))
+            except ValueError:
+                result.append('NA')
+        return result
@@ -1,4 +1,16 @@
-from sdes import SBOX, SDES, PRNG
+import io
+import os
+import tempfile
+from array import array
+from math import log10
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from sdes import SBOX, SDES, PRNG, RangeIndex, ParallelSDES, Cryptanalysis, SBoxRegistry, BBSGenerator, SeedCache, MOD, PrimeTable, LRUCache
+import utilities
 
 
 def test_PRNG():
@@ -218,10 +230,864 @@ def test_CBC():
     return
 
 
-test_PRNG()
-test_sbox()
-test_sdes_basics()
-test_sdes_keys()
-test_feistel()
-test_ECB()
-test_CBC()
+def test_codebook():
+    print('{}'.format('-' * 40))
+    print("Start of SDES codebook engine testing")
+    print()
+
+    sdes = SDES()
+    codebook = SDES()
+    print('codebook.set_parameter(engine,codebook) = {}'.format(codebook.set_parameter('engine', 'codebook')))
+    print('codebook.set_parameter(engine,table) = {}'.format(codebook.set_parameter('engine', 'table')))
+    print()
+
+    p = [11, 503, 27691, 683]
+    q = [19, 23, 11, 503]
+    rounds = [2, 3, 4, 2]
+    plaintexts = ['OK', 'Sit', '"Cryptography" is power', 'cryptanalysis tricks']
+    for i in range(len(plaintexts)):
+        for s in [sdes, codebook]:
+            s.set_parameter('p', p[i])
+            s.set_parameter('q', q[i])
+            s.set_parameter('rounds', rounds[i])
+        for mode in ['ECB', 'CBC']:
+            ciphertext = codebook.encrypt(plaintexts[i], mode)
+            plaintext2 = codebook.decrypt(ciphertext, mode)
+            print('{}: {} --> {} --> {}'.format(mode, plaintexts[i], ciphertext, plaintext2))
+            print('identical to feistel engine = {}'.format(
+                ciphertext == sdes.encrypt(plaintexts[i], mode)
+                and plaintext2 == sdes.decrypt(ciphertext, mode)))
+        print()
+
+    print('End of SDES codebook engine Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_stream():
+    print('{}'.format('-' * 40))
+    print("Start of SDES streaming testing")
+    print()
+
+    sdes = SDES()
+    plaintexts = ['go-go', '"Cryptography" is power', 'cryptanalysis tricks!']
+    chunk_sizes = [1, 4, 1000]
+    for plaintext in plaintexts:
+        for mode in ['ECB', 'CBC', 'CTR', 'OFB']:
+            ciphertext = sdes.encrypt(plaintext, mode)
+            print('{}: {} --> {}'.format(mode, plaintext, ciphertext))
+            for chunk_size in chunk_sizes:
+                writer = io.StringIO()
+                sdes.encrypt_stream(io.StringIO(plaintext), writer, mode, chunk_size)
+                ciphertext2 = writer.getvalue()
+                writer = io.BytesIO()
+                sdes.decrypt_stream(io.BytesIO(ciphertext2.encode()), writer, mode, chunk_size)
+                plaintext2 = writer.getvalue().decode()
+                print('chunk_size = {}: {} --> {}'.format(chunk_size, ciphertext2, plaintext2))
+        print()
+    print('sdes.encrypt_stream(.., XTS) = {}'.format(
+        sdes.encrypt_stream(io.StringIO('go'), io.StringIO(), 'XTS')))
+    print()
+
+    print('End of SDES streaming Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_modes():
+    print('{}'.format('-' * 40))
+    print("Start of SDES CTR and OFB testing")
+    print()
+
+    sdes = SDES()
+    p = [11, 503, 27691]
+    q = [19, 23, 11]
+    plaintexts = ['OK', '"Cryptography" is power', 'In CTR mode, no block is decrypted!']
+    blocks = list(range(0, 4096, 97))
+    for i in range(len(plaintexts)):
+        sdes.set_parameter('p', p[i])
+        sdes.set_parameter('q', q[i])
+        for mode in ['CTR', 'OFB']:
+            ciphertext = sdes.encrypt(plaintexts[i], mode)
+            plaintext2 = sdes.decrypt(ciphertext, mode)
+            print('{}: {} --> {} --> {}'.format(mode, plaintexts[i], ciphertext, plaintext2))
+            print('encrypt_blocks = decrypt_blocks = {}'.format(
+                list(sdes.encrypt_blocks(blocks, mode)) == list(sdes.decrypt_blocks(blocks, mode))))
+        print()
+
+    print('End of SDES CTR and OFB Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_range():
+    print('{}'.format('-' * 40))
+    print("Start of SDES decrypt_range testing")
+    print()
+
+    sdes = SDES()
+    plaintext = 'Random access: "Cryptography" is power,\nand cryptanalysis tricks!'
+    ranges = [[0, 6], [7, 13], [15, 29], [40, 100]]
+    for mode in ['ECB', 'CTR']:
+        ciphertext = sdes.encrypt(plaintext, mode)
+        index = RangeIndex(8)
+        index.build(io.BytesIO(ciphertext.encode()))
+        print('{}: {}'.format(mode, ciphertext.replace('\n', ' ')))
+        for start, end in ranges:
+            plaintext2 = sdes.decrypt_range(ciphertext, start, end, mode)
+            print('decrypt_range({},{}) = {}'.format(start, end, plaintext2.replace('\n', ' ')))
+            print('with index = {}'.format(
+                plaintext2 == sdes.decrypt_range(io.BytesIO(ciphertext.encode()), start, end, mode, index)))
+        print()
+    for mode in ['ECB', 'CTR']:
+        for plaintext in ['abQ', 'Q', 'Qa bQ.QQ', 'xyQ\nQ']:
+            ciphertext = sdes.encrypt(plaintext, mode)
+            expected = sdes.decrypt(ciphertext, mode)
+            ranges = [[start, end] for start in range(len(ciphertext) + 2)
+                      for end in range(start, len(ciphertext) + 3)]
+            print('{} {!r}: decrypt_range = decrypt[start:end] for {} ranges = {}'.format(
+                mode, plaintext, len(ranges),
+                all(sdes.decrypt_range(ciphertext, start, end, mode) == expected[start:end]
+                    for start, end in ranges)))
+    print()
+    print('sdes.decrypt_range(.., CBC) = {}'.format(sdes.decrypt_range(ciphertext, 0, 6, 'CBC')))
+    print()
+
+    print('End of SDES decrypt_range Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_parallel():
+    print('{}'.format('-' * 40))
+    print("Start of ParallelSDES testing")
+    print()
+
+    sdes = SDES()
+    parallel = ParallelSDES(2)
+    print('parallel.get_value(workers) = {}'.format(parallel.get_value('workers')))
+    print('parallel.set_parameter(workers,0) = {}'.format(parallel.set_parameter('workers', 0)))
+    print('parallel.set_parameter(workers,4) = {}'.format(parallel.set_parameter('workers', 4)))
+    print('parallel.get_value(workers) = {}'.format(parallel.get_value('workers')))
+    print()
+
+    plaintext = '"Cryptography" is power'
+    for mode in ['ECB', 'CBC', 'CTR', 'OFB']:
+        ciphertext = parallel.encrypt(plaintext, mode)
+        print('{}: {} --> {} --> {}'.format(mode, plaintext, ciphertext, parallel.decrypt(ciphertext, mode)))
+        print('identical to SDES = {}'.format(ciphertext == sdes.encrypt(plaintext, mode)))
+    parallel.close()
+    print()
+
+    plaintext = '"Cryptography" is power, cryptanalysis tricks!\n' * 100
+    with ParallelSDES(2, use_numpy=False) as parallel:
+        parallel.PARALLEL_MIN_BLOCKS = 1024
+        parallel.MIN_CHUNK_BLOCKS = 256
+        for mode in ['ECB', 'CBC', 'CTR']:
+            ciphertext = parallel.encrypt(plaintext, mode)
+            print('{}: pool identical to SDES = {}, decrypt = {}'.format(
+                mode, ciphertext == sdes.encrypt(plaintext, mode),
+                parallel.decrypt(ciphertext, mode) == sdes.decrypt(ciphertext, mode) == plaintext))
+        print('use_numpy False: pool started = {}'.format(parallel._executor is not None))
+    with ParallelSDES(2) as parallel:
+        parallel.PARALLEL_MIN_BLOCKS = 1024
+        print('parallel.get_value(use_numpy) = {}, set_parameter(use_numpy, 1) = {}'.format(
+            parallel.get_value('use_numpy'), parallel.set_parameter('use_numpy', 1)))
+        ciphertext = parallel.encrypt(plaintext, 'ECB')
+        print('use_numpy True: identical to SDES = {}, pool started only without numpy = {}'.format(
+            ciphertext == sdes.encrypt(plaintext, 'ECB'), (parallel._executor is not None) == (np is None)))
+    print()
+
+    print('End of ParallelSDES Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_brute_force():
+    print('{}'.format('-' * 40))
+    print("Start of Cryptanalysis testing")
+    print()
+
+    words = ['attack', 'at', 'dawn', 'meet', 'me', 'the', 'old', 'bridge', 'under', 'tonight', 'we']
+    dict_list = [[w for w in words if w[0] == c] for c in utilities.get_base('lower')]
+    sdes = SDES()
+    sdes.set_parameter('p', 27691)
+    sdes.set_parameter('q', 11)
+    print('Cryptanalysis.set_key(.., 101) = {}'.format(Cryptanalysis.set_key(SDES(), '101')))
+    print('sdes.set_key(101) = {}'.format(sdes.set_key('101')))
+    print('sdes.set_parameter(cache, 0) = {}'.format(sdes.set_parameter('cache', 0)))
+    print('sdes.get_value(cache) = {}'.format(sdes.get_value('cache')))
+    plaintext = 'meet me tonight under the old bridge, we attack at dawn'
+    ofb_ciphertext = sdes.encrypt(plaintext, 'OFB')
+    cache_sizes = [len(SDES._SCHEDULES), len(SDES._CODEBOOKS), len(SDES._OFB_CYCLES)]
+    for mode in ['ECB', 'CBC']:
+        ciphertext = sdes.encrypt(plaintext, mode)
+        print('{}: key = {}, ciphertext = {}'.format(mode, sdes.get_key(), ciphertext))
+        candidates = Cryptanalysis.brute_force(ciphertext, mode, dict_list, sdes, 0.8, 40)
+        print('#candidates = {}'.format(len(candidates)))
+        print('same with Dictionary = {}'.format(
+            candidates == Cryptanalysis.brute_force(ciphertext, mode, utilities.Dictionary(words), sdes, 0.8, 40)))
+        print('best candidate = {}'.format(candidates[0]))
+        print('utilities.score_text(ciphertext) = {}'.format(utilities.score_text(ciphertext, dict_list, 0.8)))
+        cracker = SDES()
+        print('Cryptanalysis.set_key(cracker, {}) = {}'.format(candidates[0][0], Cryptanalysis.set_key(cracker, candidates[0][0])))
+        print('cracker.decrypt(ciphertext) = {}'.format(cracker.decrypt(ciphertext, mode)))
+        print()
+    print('Cryptanalysis.brute_force(.., OFB) = {}'.format(
+        Cryptanalysis.brute_force(ofb_ciphertext, 'OFB', dict_list, sdes, 0.8, 40)[0]))
+    print('shared caches unchanged = {}'.format(
+        cache_sizes == [len(SDES._SCHEDULES), len(SDES._CODEBOOKS), len(SDES._OFB_CYCLES)]))
+    print('Cryptanalysis.brute_force(.., XTS) = {}'.format(Cryptanalysis.brute_force(ciphertext, 'XTS', dict_list)))
+    print()
+
+    print('End of Cryptanalysis Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_sbox_registry():
+    print('{}'.format('-' * 40))
+    print("Start of SBoxRegistry testing")
+    print()
+
+    sdes1 = SDES()
+    sdes2 = SDES()
+    print('sdes2.set_parameter(sbox1, SBOX(sbox1.txt)) = {}'.format(sdes2.set_parameter('sbox1', SBOX('sbox1.txt'))))
+    print('shared sbox1 = {}'.format(sdes1.get_value('sbox1') is sdes2.get_value('sbox1')))
+    print('sdes2.set_parameter(sbox1, sbox2) = {}'.format(sdes2.set_parameter('sbox1', 'sbox2')))
+    print('sdes2.set_parameter(sbox1, sbox3) = {}'.format(sdes2.set_parameter('sbox1', 'sbox3')))
+    print('sdes2 sbox1 is registered sbox2 = {}'.format(sdes2.get_value('sbox1') is SBoxRegistry.get('sbox2')))
+    sbox = sdes1.get_value('sbox1')
+    print('sbox.set_box(sbox2.txt): ', end='')
+    sbox.set_box('sbox2.txt')
+    sbox.get_box()[0][0] = '000'
+    print(sbox)
+    print()
+
+    print('End of SBoxRegistry Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_bbs_generator():
+    print('{}'.format('-' * 40))
+    print("Start of BBSGenerator testing")
+    print()
+
+    p = [383, 11, 27691]
+    q = [503, 19, 11]
+    for i in range(len(p)):
+        generator = BBSGenerator(p[i], q[i])
+        bits = format(generator.next_bits(8), '08b') + format(generator.next_bits(12), '012b')
+        print('BBSGenerator({},{}): {}, same as PRNG.BBS = {}'.format(p[i], q[i], bits, bits == PRNG.BBS(p[i], q[i], 20)))
+        generator.seek(12)
+        print('seek(12): next_bits(8) = {}'.format(format(generator.next_bits(8), '08b')))
+        print('index = {}, read_bytes(2) = {}'.format(generator.get_index(), generator.read_bytes(2)))
+        print()
+    print('next_bits(-1) = {}'.format(generator.next_bits(-1)))
+    generator.seek(0)
+    bits = ''.join([str(bit) for bit, _ in zip(generator, range(8))])
+    print('first 8 bits by iteration = {}, same as PRNG.BBS = {}'.format(bits, bits == PRNG.BBS(p[-1], q[-1], 8)))
+    print('PRNG.BBS(383,383,8) = {}'.format(PRNG.BBS(383, 383, 8)))
+    try:
+        BBSGenerator(383, 383)
+    except AssertionError as error:
+        print('BBSGenerator(383,383): {}'.format(error))
+    sdes = SDES()
+    print('sdes.set_parameter(p, {}) = {}'.format(sdes.get_value('q'), sdes.set_parameter('p', sdes.get_value('q'))))
+    print()
+
+    cache = SeedCache(2)
+    for n in [383 * 503, 11 * 19, 383 * 503, 27691 * 11, 11 * 19]:
+        print('cache.get({}) = {}'.format(n, cache.get(n)))
+    print('#entries = {}, (hits, misses) = {}'.format(len(cache), cache.get_stats()))
+    print()
+
+    print('End of BBSGenerator Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_mod_batch():
+    print('{}'.format('-' * 40))
+    print("Start of MOD batch testing")
+    print()
+
+    values = [3, 5, 9, 12, 0, 7]
+    m = 26
+    print('values = {}, m = {}'.format(values, m))
+    print('MOD.gcd_many(values,m) = {}'.format(MOD.gcd_many(values, m)))
+    print('MOD.mul_inv_many(values,m) = {}'.format(MOD.mul_inv_many(values, m)))
+    print('MOD.pow_many(values,3,m) = {}'.format(MOD.pow_many(values, 3, m)))
+    print('MOD.mul_inv_many([],m) = {}'.format(MOD.mul_inv_many([], m)))
+    print('MOD.mul_inv_many(values,1) = {}'.format(MOD.mul_inv_many(values, 1)))
+    print()
+
+    print('End of MOD batch Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_B6_codec():
+    print('{}'.format('-' * 40))
+    print("Start of B6 codec testing")
+    print()
+
+    texts = ['ab.', 'Cryptography is power', utilities.get_base('B6'), '']
+    for text in texts:
+        codes = utilities.encode_B6_text(text)
+        print('encode_B6_text({}) = {}'.format(text, list(codes)))
+        print('same as encode = {}, round trip = {}'.format(
+            [int(utilities.encode(c, 'B6'), 2) for c in text] == list(codes),
+            utilities.decode_B6_codes(codes) == text))
+    print('decode_B6_codes([0,1,62]) = {}'.format(utilities.decode_B6_codes([0, 1, 62])))
+    cases = [(0, 1, 62), array('B', [0, 1, 62]), array('H', [0, 1, 62]), array('I', [0, 1, 62]),
+             array('q', [0, 1, 62]), memoryview(array('H', [0, 1, 62])), bytearray([0, 1, 62])]
+    if np is not None:
+        cases += [np.array([0, 1, 62], dtype=np.uint16), np.array([0, 1, 62], dtype=np.int64)]
+    print('typed sequences decode to ab. = {}'.format([utilities.decode_B6_codes(c) for c in cases]))
+    print()
+
+    cases = ['ab!', 'abc', 42]
+    for c in cases:
+        print('encode_B6_text({!r}) = '.format(c), end='')
+        print(utilities.encode_B6_text(c))
+    cases = [5, True, [0, 64], [-1], 'abc', [0.5], array('H', [0, 300]), array('i', [-1])]
+    for c in cases:
+        print('decode_B6_codes({!r}) = '.format(c), end='')
+        print(repr(utilities.decode_B6_codes(c)))
+    print()
+
+    print('End of B6 codec Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_prime_table():
+    print('{}'.format('-' * 40))
+    print("Start of PrimeTable testing")
+    print()
+
+    primes = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+    binary_file = PrimeTable.BINARY_FILE
+    with tempfile.TemporaryDirectory() as folder:
+        text_file = os.path.join(folder, 'primes.txt')
+        utilities.text_to_file(' '.join(str(p) for p in primes) + '\n', text_file)
+        PrimeTable.BINARY_FILE = os.path.join(folder, 'primes.bin')
+        print('PrimeTable.convert(primes.txt) = {}'.format(PrimeTable.convert(text_file)))
+        PrimeTable.reset()
+        print('read back = {}'.format([PrimeTable.get_prime(n) for n in range(1, len(primes) + 1)] == primes))
+        print('get_prime(15) = {}'.format(PrimeTable.get_prime(15)))
+        PrimeTable.reset()
+
+        utilities.text_to_file('7 11 4294967311', text_file)
+        print('PrimeTable.convert(4294967311) = {}'.format(PrimeTable.convert(text_file)))
+        print('binary file removed = {}'.format(not os.path.exists(PrimeTable.BINARY_FILE)))
+        primes_file = PRNG.PRIMES_FILE
+        PRNG.PRIMES_FILE = text_file
+        print('get_prime(3) from text = {}'.format(PrimeTable.get_prime(3)))
+        PRNG.PRIMES_FILE = primes_file
+        PrimeTable.reset()
+    PrimeTable.BINARY_FILE = binary_file
+    print('PrimeTable.sieve(2**32, 2**32 + 50) = {}'.format(PrimeTable.sieve(2 ** 32, 2 ** 32 + 50)))
+    print('PrimeTable.get_prime(0) = {}'.format(PrimeTable.get_prime(0)))
+    print()
+
+    print('End of PrimeTable Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_primes():
+    print('{}'.format('-' * 40))
+    print("Start of MOD prime testing")
+    print()
+
+    primes = [n for n in range(2, 200) if all(n % d != 0 for d in range(2, n))]
+    print('MOD.primes_in_range(0,50) = {}'.format(MOD.primes_in_range(0, 50)))
+    print('MOD.primes_in_range(2,200) is trial division = {}'.format(MOD.primes_in_range(2, 200) == primes))
+    print('MOD.is_prime agrees = {}'.format([n for n in range(-5, 200) if MOD.is_prime(n)] == primes))
+    print('MOD.primes_in_range(262140,262200) = {}'.format(MOD.primes_in_range(262140, 262200)))
+    print('MOD.primes_in_range(50,10) = {}'.format(MOD.primes_in_range(50, 10)))
+    print('MOD.primes_in_range(0,5.0) = {}'.format(MOD.primes_in_range(0, 5.0)))
+    print()
+
+    blum = MOD.blum_primes(0, 200)
+    print('MOD.blum_primes(0,200) = {}'.format(blum))
+    print('all p = 3 mod 4 = {}, complete = {}'.format(
+        all(p % 4 == 3 for p in blum), blum == [p for p in primes if p % 4 == 3]))
+    print("MOD.blum_primes('0',200) = {}".format(MOD.blum_primes('0', 200)))
+    print()
+
+    carmichael = [561, 1105, 1729, 2465, 2821, 6601, 8911, 41041, 825265, 321197185]
+    print('Carmichael numbers: {}'.format([MOD.is_prime(n) for n in carmichael]))
+    pseudoprimes = [2047, 3215031751, 3825123056546413051]
+    print('Strong pseudoprimes: {}'.format([MOD.is_prime(n) for n in pseudoprimes]))
+    cases = [97, 7919, 2 ** 31 - 1, 2 ** 61 - 1, 2 ** 64 - 59, 2 ** 89 - 1, 2 ** 64 - 1, 2.0, '7']
+    for c in cases:
+        print('MOD.is_prime({!r}) = {}'.format(c, MOD.is_prime(c)))
+    print()
+
+    print('End of MOD prime Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_feistel_int():
+    print('{}'.format('-' * 40))
+    print("Start of SDES integer core testing")
+    print()
+
+    sdes = SDES()
+    sdes.set_parameter('p', 27691)
+    sdes.set_parameter('q', 11)
+    sbox1 = sdes.get_value('sbox1')
+    sbox2 = sdes.get_value('sbox2')
+    size = sdes.get_value('block_size') // 2
+    i = size // 2 - 1
+    expanded = []
+    for R in range(2 ** size):
+        r = format(R, '0{}b'.format(size))
+        expanded.append(int(r[:i] + r[i + 1] + r[i] + r[i + 1] + r[i] + r[i + 2:], 2))
+    print('expand_int matches the string rule = {}'.format(
+        [sdes.expand_int(R) for R in range(2 ** size)] == expanded))
+
+    valid = True
+    for k in range(2 ** (size + 2)):
+        for R in range(2 ** size):
+            x = format(expanded[R] ^ k, '0{}b'.format(size + 2))
+            f = sbox1.substitute(x[:len(x) // 2]) + sbox2.substitute(x[len(x) // 2:])
+            valid = valid and sdes.F_int(R, k) == int(f, 2)
+    print('F_int matches the S-boxes = {}'.format(valid))
+
+    blocks = list(range(2 ** (2 * size)))
+    subkeys = [int(sdes.get_subkey(j + 1), 2) for j in range(sdes.get_value('rounds'))]
+    expected = []
+    for b in blocks:
+        for k in subkeys:
+            b = sdes.feistel_int(b, k)
+        expected.append(((b & (2 ** size - 1)) << size) | (b >> size))
+    ciphertext = list(sdes.encrypt_blocks(blocks, 'ECB'))
+    print('encrypt_blocks = rounds of feistel_int = {}'.format(ciphertext == expected))
+    print('decrypt_blocks restores all blocks = {}'.format(list(sdes.decrypt_blocks(ciphertext, 'ECB')) == blocks))
+    print("feistel('101110010011','10101001') = {}".format(sdes.feistel('101110010011', '10101001')))
+    print("feistel_int(0b101110010011,0b10101001) = {}".format(format(sdes.feistel_int(0b101110010011, 0b10101001), '012b')))
+    print()
+
+    print('End of SDES integer core Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_passthrough():
+    print('{}'.format('-' * 40))
+    print("Start of passthrough testing")
+    print()
+
+    base = utilities.get_base('lower')
+    print("split_passthrough('go-go!!') = {}".format(utilities.split_passthrough('go-go!!', base)))
+    print("get_positions('I have 3 cents.','c.h') = {}".format(utilities.get_positions('I have 3 cents.', 'c.h')))
+    print()
+
+    texts = ['go-go!!', '"Cryptography" is power\n', '!!!', '', 'plain', 'a\u00e9b\u20ac\u20ac, c\n\n']
+    for text in texts:
+        cleaned, passthrough = utilities.split_passthrough(text, base)
+        others = ''.join([c for c in text if c not in base])
+        print('{!r}: cleaned = {!r}, #runs = {}'.format(text, cleaned, len(passthrough)))
+        print('same as clean_text = {}, round trip = {}, get_positions round trip = {}'.format(
+            cleaned == utilities.clean_text(text, others),
+            utilities.insert_positions(cleaned, passthrough) == text,
+            utilities.insert_positions(cleaned, utilities.get_positions(text, others)) == text))
+    print()
+
+    print('End of passthrough Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_batch_engines():
+    print('{}'.format('-' * 40))
+    print("Start of SDES batch engine testing")
+    print()
+
+    base = utilities.get_base('B6')
+    blocks = list(range(4096))
+    plaintext = ''.join([base[b >> 6] + base[b & 63] for b in blocks])
+    scalar = SDES()
+    scalar.NUMPY_MIN_BLOCKS = len(blocks) + 1
+    expected = {}
+    for mode in ['ECB', 'CBC', 'CTR', 'OFB']:
+        codes = utilities.encode_B6_text(scalar.encrypt(plaintext, mode))
+        expected[mode] = [(codes[i] << 6) | codes[i + 1] for i in range(0, len(codes), 2)]
+
+    if np is None:
+        print('numpy is not installed: vectorized engine skipped')
+    else:
+        sdes = SDES()
+        for mode in ['ECB', 'CBC', 'CTR', 'OFB']:
+            ciphertext = sdes.encrypt(plaintext, mode)
+            result = sdes.encrypt_blocks(np.arange(len(blocks)), mode)
+            print('{}: numpy encrypt = scalar = {}, encrypt_blocks = scalar = {}, decrypt_blocks = {}'.format(
+                mode, ciphertext == scalar.encrypt(plaintext, mode), result.tolist() == expected[mode],
+                sdes.decrypt_blocks(result, mode).tolist() == blocks))
+    print()
+
+    parallel = SDES()
+    parallel.PARALLEL_MIN_BLOCKS = 1024
+    for mode in ['ECB', 'CBC', 'CTR']:
+        result = parallel.encrypt_blocks(blocks, mode, 2)
+        print('{}: encrypt_blocks(.., workers=2) = scalar = {}, decrypt_blocks(.., workers=2) = {}'.format(
+            mode, list(result) == expected[mode], list(parallel.decrypt_blocks(result, mode, 2)) == blocks))
+    print()
+
+    print('End of SDES batch engine Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_dictionary():
+    print('{}'.format('-' * 40))
+    print("Start of Dictionary testing")
+    print()
+
+    words = ['attack', 'at', 'Dawn', 'meet', 'me', '3d', 'the']
+    with tempfile.TemporaryDirectory() as folder:
+        dict_file = os.path.join(folder, 'words.txt')
+        snapshot = os.path.join(folder, 'words.snapshot')
+        utilities.text_to_file('\n'.join(words) + '\n', dict_file)
+        dictionary = utilities.Dictionary.load(dict_file, snapshot)
+        print('Dictionary.load(words.txt): {} words, snapshot written = {}'.format(
+            len(dictionary), os.path.isfile(snapshot)))
+        print('sorted(dictionary) = {}'.format(sorted(dictionary)))
+        print("'dawn' in dictionary = {}, 'Dawn' in dictionary = {}".format('dawn' in dictionary, 'Dawn' in dictionary))
+        print('loaded once = {}'.format(utilities.Dictionary.load(dict_file, snapshot) is dictionary))
+        utilities.Dictionary._CACHE.clear()
+        print('read from snapshot = {}'.format(set(utilities.Dictionary.load(dict_file, snapshot)) == set(dictionary)))
+        utilities.text_to_file('\n'.join(words + ['bridge']) + '\n', dict_file)
+        os.utime(dict_file, ns=(0, 0))
+        dictionary2 = utilities.Dictionary.load(dict_file, snapshot)
+        print("modified file reloaded = {}".format('bridge' in dictionary2 and dictionary2 is not dictionary))
+        print('Dictionary.load(missing.txt) = ', end='')
+        print(utilities.Dictionary.load(os.path.join(folder, 'missing.txt')))
+    print()
+
+    print('End of Dictionary Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_freq():
+    print('{}'.format('-' * 40))
+    print("Start of frequency testing")
+    print()
+
+    text = 'Meet me tonight under the old bridge,\nWe attack at DAWN!'
+    english = [text.lower().count(chr(97 + i)) for i in range(26)]
+    print('get_freq(text) = {}'.format(utilities.get_freq(text)))
+    print('default is English = {}, same as base None = {}'.format(
+        utilities.get_freq(text) == english, utilities.get_freq(text, None) == english))
+    print("get_freq(text,'tT!') = {}".format(utilities.get_freq(text, 'tT!')))
+    print("get_freq('') = {}".format(utilities.get_freq('')))
+    print()
+
+    counter = utilities.FreqCounter()
+    for i in range(0, len(text), 7):
+        counter.update(text[i:i + 7])
+    first = utilities.FreqCounter(text[:20])
+    first.merge(utilities.FreqCounter(text[20:]))
+    for base in ['', None, 'tT!', utilities.get_base('B6')]:
+        print('base = {!r}: update = get_freq = {}, merge = get_freq = {}'.format(
+            base, counter.get_freq(base) == utilities.get_freq(text, base),
+            first.get_freq(base) == utilities.get_freq(text, base)))
+    counts = counter.get_counts()
+    counts['t'] += 100
+    print('get_counts returns a copy = {}'.format(counter.get_freq() == english))
+    print()
+
+    print('End of frequency Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_statistics():
+    print('{}'.format('-' * 40))
+    print("Start of statistics testing")
+    print()
+
+    texts = ['Meet me tonight under the old bridge, we attack at DAWN!',
+             'QZXJ KVWB QZXJ', 'a', '12 ...', '']
+    counts = utilities.get_letter_counts(texts)
+    print('get_letter_counts is a list = {}, same as get_freq = {}'.format(
+        type(counts) == list and all(type(c) == list for c in counts),
+        counts == [utilities.get_freq(t) for t in texts]))
+    print()
+
+    freq = utilities.get_language_freq('English')
+    chi = []
+    ioc = []
+    for text in texts:
+        c = utilities.get_freq(text)
+        n = sum(c)
+        chi.append(sum([(c[i] - n * freq[i]) ** 2 / (n * freq[i]) for i in range(26)]) if n > 0 else float('inf'))
+        ioc.append(sum([x * (x - 1) for x in c]) / (n * (n - 1)) if n > 1 else 0.0)
+    for i in range(len(texts)):
+        print('{!r}: chi_squared = {:.4f}, index_of_coincidence = {:.4f}'.format(
+            texts[i], utilities.chi_squared(texts[i]), utilities.index_of_coincidence(texts[i])))
+    print('chi_squared matches get_freq = {}'.format(
+        all(abs(utilities.chi_squared(texts[i]) - chi[i]) < 1e-9 or chi[i] == float('inf') == utilities.chi_squared(texts[i])
+            for i in range(len(texts)))))
+    print('index_of_coincidence matches get_freq = {}'.format(
+        all(abs(utilities.index_of_coincidence(texts[i]) - ioc[i]) < 1e-9 for i in range(len(texts)))))
+    print('score_texts = chi_squared = {}'.format(
+        utilities.score_texts(texts) == [utilities.chi_squared(t) for t in texts]))
+    print('score_texts(ioc) = index_of_coincidence = {}'.format(
+        utilities.score_texts(texts, 'ioc') == [utilities.index_of_coincidence(t) for t in texts]))
+    print("score_texts(texts,'xyz') = {}".format(utilities.score_texts(texts, 'xyz')))
+    print("chi_squared(text,'French') = {}".format(utilities.chi_squared(texts[0], 'French')))
+    print()
+
+    model = utilities.NgramModel()
+    expected = sum([utilities.get_freq(texts[0])[i] * log10(freq[i]) for i in range(26)])
+    print('NgramModel().score(text) = {:.4f}, matches get_freq = {}'.format(
+        model.score(texts[0]), abs(model.score(texts[0]) - expected) < 1e-9))
+    print('score_texts = score = {}'.format(
+        all(abs(a - b) < 1e-9 for a, b in zip(model.score_texts(texts), [model.score(t) for t in texts]))))
+    model = utilities.NgramModel('the cat sat on the mat', 2)
+    print("bigram model: n = {}, score('the') = {:.4f}, score('xq') = {:.4f}".format(
+        model.get_n(), model.score('the'), model.score('xq')))
+    print('english > random = {}'.format(model.score_texts(['that hat', 'qzxj kvwb']) ==
+                                          sorted(model.score_texts(['that hat', 'qzxj kvwb']), reverse=True)))
+    print()
+
+    print('End of statistics Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_blocks():
+    print('{}'.format('-' * 40))
+    print("Start of blocks and baskets testing")
+    print()
+
+    print("text_to_blocks('abc',5,True) = {}".format(utilities.text_to_blocks('abc', 5, True)))
+    print("text_to_blocks('abcdefg',3,True,'x') = {}".format(utilities.text_to_blocks('abcdefg', 3, True, 'x')))
+    print("text_to_blocks('',3,True) = {}".format(utilities.text_to_blocks('', 3, True)))
+    print()
+
+    text = 'Meet me tonight under the old bridge,\nwe attack at dawn!'
+    for k in [1, 3, 7, 100]:
+        baskets = utilities.text_to_baskets(text, k)
+        byte_baskets = utilities.text_to_baskets(text.encode(), k)
+        trimmed = text[:len(text) // k * k]
+        print('k = {}: str baskets = text[j::k] = {}, bytes baskets = {}, blocks_to_baskets = {}'.format(
+            k, baskets == [text[j::k] for j in range(k)],
+            [bytes(b) for b in byte_baskets] == [text.encode()[j::k] for j in range(k)],
+            trimmed == '' or utilities.blocks_to_baskets(utilities.text_to_blocks(trimmed, k)) ==
+            utilities.text_to_baskets(trimmed, k)))
+    print('blocks_to_baskets([]) = ', end='')
+    print(utilities.blocks_to_baskets([]))
+    print("blocks_to_baskets(['ab','c']) = ", end='')
+    print(utilities.blocks_to_baskets(['ab', 'c']))
+    print()
+
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, 'text.txt')
+        utilities.text_to_file(text, filename)
+        for b_size, padding in [[4, True], [5, False], [12, True]]:
+            blocks = utilities.text_to_blocks(text, b_size, padding, 'q')
+            with open(filename) as text_file, open(filename, 'rb') as binary_file:
+                results = [list(utilities.iter_blocks(text, b_size, padding, 'q')),
+                           list(utilities.iter_blocks(text_file, b_size, padding, 'q', 7)),
+                           [b.decode() for b in utilities.iter_blocks(binary_file, b_size, padding, 'q', 7)],
+                           [b.decode() for b in utilities.iter_blocks(text.encode(), b_size, padding, 'q')],
+                           [b.decode() for b in utilities.iter_blocks(memoryview(text.encode()), b_size, padding, 'q')]]
+            print('b_size = {}, padding = {}: str, text file, binary file, bytes, memoryview = text_to_blocks: {}'.format(
+                b_size, padding, [result == blocks for result in results]))
+    print()
+
+    print('End of blocks and baskets Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_sbox_sizes():
+    print('{}'.format('-' * 40))
+    print("Start of SBOX size testing")
+    print()
+
+    contents = ['01-11-00-10\n10-00-11-01',
+                '0110-1010-0001-1111-0100-0011-1100-1000-0101-1001-0000-0111-1110-0010-1011-1101\n'
+                '1011-0001-1110-0100-0111-1000-0010-1101-0000-1111-0101-1010-0011-1100-0110-1001']
+    for content in contents:
+        sbox = SBOX.from_text(content)
+        box = sbox.get_box()
+        size = sbox.get_size()
+        values = [format(v, '0{}b'.format(size)) for v in range(2 ** size)]
+        expected = [box[int(v[0])][int(v[1:], 2)] for v in values]
+        print(sbox)
+        print('substitute = row/column lookup = {}, substitute_int = substitute = {}'.format(
+            [sbox.substitute(v) for v in values] == expected,
+            [sbox.substitute_int(v) for v in range(2 ** size)] == [int(e, 2) for e in expected]))
+        print('substitute({}) = {!r}, substitute_int({}) = {}'.format(
+            '1' * (size + 1), sbox.substitute('1' * (size + 1)), 2 ** size, sbox.substitute_int(2 ** size)))
+    print('SBOX has no __dict__ = {}'.format(not hasattr(SBOX(), '__dict__')))
+    sdes = SDES()
+    sdes.set_parameter('sbox1', SBOX('sbox1.txt'))
+    installed = sdes.get_value('sbox1')
+    print('sizes 3 and 5 refused for 12-bit blocks = {}'.format(
+        [sdes.set_parameter(name, SBOX.from_text(c)) for name in ('sbox1', 'sbox2') for c in contents] == [False] * 4))
+    print('installed sbox1 unchanged = {}, block_size 12 accepted = {}'.format(
+        sdes.get_value('sbox1') is installed, sdes.set_parameter('block_size', 12)))
+    print()
+
+    print('End of SBOX size Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_sbox_files():
+    print('{}'.format('-' * 40))
+    print("Start of SBOX file testing")
+    print()
+
+    sbox1 = SBOX('sbox1.txt')
+    print('SBOX(sbox1.txt) = from_text(SBOX1_TEXT) = {}'.format(
+        sbox1.get_box() == SBOX.from_text(SBOX.SBOX1_TEXT).get_box()))
+    print('SBOX(sbox2.txt) = from_text(SBOX2_TEXT) = {}'.format(
+        SBOX('sbox2.txt').get_box() == SBOX.from_text(SBOX.SBOX2_TEXT).get_box()))
+    folder = os.getcwd()
+    with tempfile.TemporaryDirectory() as other:
+        os.chdir(other)
+        try:
+            sbox = SBOX('sbox1.txt')
+            print('SBOX(sbox1.txt) from another directory = {}'.format(sbox.get_box() == sbox1.get_box()))
+            utilities.text_to_file('01-11-00-10\n10-00-11-01', os.path.join(other, 'sbox1.txt'))
+            print('local sbox1.txt first: {}'.format(SBOX('sbox1.txt')))
+            utilities.text_to_file('10-00-11-01\n01-11-00-10', os.path.join(other, 'sbox1.txt'))
+            os.utime('sbox1.txt', ns=(10 ** 9, 10 ** 9))
+            print('modified sbox1.txt reloaded: {}'.format(SBOX('sbox1.txt')))
+        finally:
+            os.chdir(folder)
+    print()
+
+    print('End of SBOX file Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_caches():
+    print('{}'.format('-' * 40))
+    print("Start of LRUCache testing")
+    print()
+
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    print("cache.get('a') = {}".format(cache.get('a')))
+    cache.put('c', 3)
+    print("after put('c'): get('b') = {}, get('a') = {}, get('c') = {}".format(
+        cache.get('b'), cache.get('a'), cache.get('c')))
+    print('#entries = {}, (hits, misses) = {}'.format(len(cache), cache.get_stats()))
+    print()
+
+    sdes = SDES()
+    sdes.set_parameter('engine', 'codebook')
+    for key in Cryptanalysis.get_keys()[:300]:
+        sdes.set_key(key)
+        sdes.encrypt('bounded caches', 'OFB')
+    print('#schedules <= {} = {}, #codebooks <= {} = {}, #OFB cycles <= {} = {}'.format(
+        SDES.MAX_CACHED_SCHEDULES, len(SDES._SCHEDULES) <= SDES.MAX_CACHED_SCHEDULES,
+        SDES.MAX_CACHED_CODEBOOKS, len(SDES._CODEBOOKS) <= SDES.MAX_CACHED_CODEBOOKS,
+        SDES.MAX_CACHED_OFB_CYCLES, len(SDES._OFB_CYCLES) <= SDES.MAX_CACHED_OFB_CYCLES))
+    print()
+
+    print('End of LRUCache Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+def test_score_text():
+    print('{}'.format('-' * 40))
+    print("Start of score_text testing")
+    print()
+
+    dict_words = ['at', 'attack', 'dawn', 'me', 'meet', 'the']
+    dict_list = [[w for w in dict_words if w[0] == c] for c in utilities.get_base('lower')]
+    texts = [['clear pass', 'meet me at the attack at dawn\n' * 20, 0.9],
+             ['clear fail', 'qeet xe zt khe vttack ut dawn\n' * 20, 0.9],
+             ['at threshold', 'meet me at the attack at dawn the xq at', 0.9],
+             ['just below', 'meet me at the attack at dawn the xq xq', 0.9],
+             ['mismatch at the end', 'meet me at the xq', 0.8],
+             ['no words', '', 0.9]]
+    for name, text, threshold in texts:
+        match, mismatch = utilities.analyze_text(text, dict_list)
+        full = match + mismatch > 0 and match / (match + mismatch) >= threshold
+        result, words = utilities.score_text(text, dict_list, threshold)
+        print('{}: score_text = full scan = {} ({}), {} of {} words examined'.format(
+            name, result == full, result, words, match + mismatch))
+        print('same with Dictionary = {}'.format(
+            utilities.score_text(text, utilities.Dictionary(dict_words), threshold) == (result, words)))
+    for name, text, threshold in texts[:2]:
+        words = utilities.score_text(text, dict_list, threshold)[1]
+        print('{}: decided early = {}'.format(name, words < sum(utilities.analyze_text(text, dict_list))))
+    print()
+
+    print('End of score_text Testing')
+    print('{}'.format('-' * 40))
+    print()
+    return
+
+
+if __name__ == '__main__':
+    test_PRNG()
+    test_sbox()
+    test_sdes_basics()
+    test_sdes_keys()
+    test_feistel()
+    test_ECB()
+    test_CBC()
+    test_codebook()
+    test_stream()
+    test_modes()
+    test_range()
+    test_parallel()
+    test_brute_force()
+    test_sbox_registry()
+    test_bbs_generator()
+    test_mod_batch()
+    test_B6_codec()
+    test_prime_table()
+    test_primes()
+    test_feistel_int()
+    test_passthrough()
+    test_batch_engines()
+    test_dictionary()
+    test_freq()
+    test_statistics()
+    test_blocks()
+    test_sbox_sizes()
+    test_sbox_files()
+    test_caches()
+    test_score_text()
@@ -1,4 +1,14 @@
-from math import ceil
+import marshal
+import operator
+import os
+import re
+from collections import Counter
+from math import log10
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 DICT_FILE = 'engmix.txt'
 PAD = 'q'
@@ -24,9 +34,23 @@ def get_base(base_type):
                       B6: lower, uppper, num, dot, space
                       BA: upper + lower + num + special + ' \n'
                       all: upper, lower, numerical and special characters
+                  All bases are built once when the module is loaded (see _BASES)
     Errors:       if invalid base type, print error msg, return empty string
     ---------------------------------------------------
     """
+    if type(base_type) == str and base_type in _BASES:
+        return _BASES[base_type]
+    print('Error(get_base): undefined base type')
+    return ''
+
+def _build_bases():
+    """
+    ----------------------------------------------------
+    Parameters:   -
+    Return:       bases (dict): base_type --> base string
+    Description:  Builds all base strings supported by get_base
+    ---------------------------------------------------
+    """
     lower = "".join([chr(ord('a')+i) for i in range(26)])
     upper = lower.upper()
     num = "".join([str(i) for i in range(10)])
@@ -34,34 +58,19 @@ def get_base(base_type):
     for i in range(ord('!'),127):
         if not chr(i).isalnum():
             special+= chr(i)
-            
-    result = ''
-    if base_type == 'lower':
-        result = lower
-    elif base_type == 'upper':
-        result = upper
-    elif base_type == 'alpha':
-        result = upper + lower
-    elif base_type == 'lowernum':
-        result = lower + num
-    elif base_type == 'uppernum':
-        result = upper + num
-    elif base_type == 'alphanum':
-        result = upper + lower + num
-    elif base_type == 'special':
-        result = special
-    elif base_type == 'nonalpha':
-        result = special + num
-    elif base_type == 'B6': #64 symbols
-        result = lower + upper + num + '.' + ' '
-    elif base_type == 'BA': #96 symbols
-        result = upper + lower + num + special + ' \n'
-    elif base_type == 'all':
-        result = upper + lower + num + special
-    else:
-        print('Error(get_base): undefined base type')
-        result = ''
-    return result
+    return {'lower': lower,
+            'upper': upper,
+            'alpha': upper + lower,
+            'lowernum': lower + num,
+            'uppernum': upper + num,
+            'alphanum': upper + lower + num,
+            'special': special,
+            'nonalpha': special + num,
+            'B6': lower + upper + num + '.' + ' ', #64 symbols
+            'BA': upper + lower + num + special + ' \n', #96 symbols
+            'all': upper + lower + num + special}
+
+_BASES = _build_bases()
 
 '______________________________________________________________________________'
 
@@ -158,7 +167,9 @@ def load_dictionary(dict_file=None):
                   dictionary is assumed to be formatted as each word in a separate line
                   Returns a list of lists, list 0 contains all words starting with 'a'
                   list 1 all words starting with 'b' and so forth.
+                  Words that do not start with a letter from a to z are skipped
                   if no parameter given, use default file (DICT_FILE)
+                  See Dictionary for a faster alternative
     Errors:       if invalid filename, print error msg, return []
     ---------------------------------------------------
     """
@@ -175,12 +186,114 @@ def load_dictionary(dict_file=None):
     dict_list = [[] for _ in range(26)]
     for w in dict_words:
         word = w.strip('\n')
-        dict_list[alphabet.index(word[0])]+=[word]
+        if word != '' and word[0] in alphabet:
+            dict_list[alphabet.index(word[0])]+=[word]
     infile.close()
     return dict_list
 
 '______________________________________________________________________________'
 
+class Dictionary:
+    """
+    ----------------------------------------------------
+    Description: Dictionary words stored in a frozenset
+                 Can be used in place of the list returned by load_dictionary
+                     (analyze_text, is_plaintext, ...)
+                 Words are stored and looked up in lower case
+                 Files are loaded once per process, see load
+    ----------------------------------------------------
+    """
+    _CACHE = {}
+
+    def __init__(self, words=()):
+        """
+        ----------------------------------------------------
+        Parameters:   words (iterable): default = no words
+        Description:  Creates a dictionary of the given words
+        ---------------------------------------------------
+        """
+        self._words = frozenset([w.lower() for w in words])
+
+    def __contains__(self, word):
+        """
+        ----------------------------------------------------
+        Parameters:   word (str): a lower case word
+        Return:       True/False
+        Description:  Checks if word is in the dictionary, e.g. 'the' in dictionary
+        ---------------------------------------------------
+        """
+        return word in self._words
+
+    def __len__(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       size (int): #words
+        ---------------------------------------------------
+        """
+        return len(self._words)
+
+    def __iter__(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       words (iterator): all words, in no particular order
+        ---------------------------------------------------
+        """
+        return iter(self._words)
+
+    @staticmethod
+    def load(dict_file=None, snapshot=None):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   dict_file (str): default = DICT_FILE
+                          one word per line (as in load_dictionary)
+                      snapshot (str): marshal file, default = None (no snapshot)
+        Return:       dictionary (Dictionary)
+        Description:  Returns the dictionary of the given file
+                      The dictionary is cached by absolute path and is only
+                          loaded again if the file is modified
+                      If a snapshot is given, the words are read from it when
+                          it matches the size and modification time of
+                          dict_file, otherwise it is (re)written
+        Errors:       if invalid or missing file, print error msg, return None
+        ---------------------------------------------------
+        """
+        if dict_file == None:
+            dict_file = DICT_FILE
+        if not is_valid_filename(os.path.basename(dict_file)) or not os.path.isfile(dict_file):
+            print('Error(Dictionary.load): invalid filename')
+            return None
+        path = os.path.abspath(dict_file)
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = Dictionary._CACHE.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        words = None
+        if snapshot is not None and os.path.isfile(snapshot):
+            try:
+                with open(snapshot, 'rb') as f:
+                    data = marshal.load(f)
+                if type(data) == tuple and len(data) == 2 and data[0] == version:
+                    words = data[1]
+            except (EOFError, ValueError, TypeError):
+                words = None
+        dictionary = Dictionary()
+        if words is not None:
+            dictionary._words = words
+        else:
+            with open(path, 'r', encoding="ISO-8859-15") as infile:
+                dictionary = Dictionary([w for w in infile.read().split('\n') if w != ''])
+            if snapshot is not None:
+                with open(snapshot, 'wb') as f:
+                    marshal.dump((version, dictionary._words), f)
+        Dictionary._CACHE[path] = (version, dictionary)
+        return dictionary
+
+'______________________________________________________________________________'
+
 def text_to_words(text):
     """
     ----------------------------------------------------
@@ -194,17 +307,23 @@ def text_to_words(text):
     ---------------------------------------------------
     """
     assert type(text) == str, 'invalid input'
+    return list(iter_words(text))
+
+_WORD_PATTERN = re.compile('[^ \n]+')
+
+def iter_words(text):
+    """
+    ----------------------------------------------------
+    Parameters:   text (str)
+    Return:       words (generator): words of text, one at a time
+    Description:  Lazy version of text_to_words, yields the same words
+                  Words are separated by spaces and newlines
+                  Special characters at the start and at the end are removed
+    ---------------------------------------------------
+    """
     special = get_base('special')
-    word_list = []
-    lines = text.split('\n')
-    for line in lines:
-        line = line.strip('\n')
-        line = line.split(' ')
-        for i in range(len(line)):
-            if line[i] != '':
-                line[i] = line[i].strip(special)
-                word_list+=[line[i]]
-    return word_list
+    for match in _WORD_PATTERN.finditer(text):
+        yield match.group().strip(special)
 
 '______________________________________________________________________________'
 
@@ -212,39 +331,53 @@ def analyze_text(text, dict_list):
     """
     ----------------------------------------------------
     Parameters:   text (str)
-                  dict_list (list)
+                  dict_list (list or Dictionary)
     Return:       matches (int)
                   mismatches (int)
     Description:  Reads a given text, checks if each word appears in given dictionary
                   Returns number of matches and mismatches.
                   Words are compared in lowercase
+                  Words that do not start with a letter from a to z are
+                      mismatches, unless dict_list is a Dictionary
                   Assumes a proper dict_list
-    Asserts:      text is a string and dict_list is a list
+    Asserts:      text is a string and dict_list is a list or a Dictionary
     ---------------------------------------------------
     """
-    assert type(text) == str and type(dict_list) == list, 'invalid input'
-    word_list = text_to_words(text)
-    alphabet = get_base('lower')
+    assert type(text) == str and isinstance(dict_list, (list, Dictionary)), 'invalid input'
     match = 0
     mismatch = 0
-    for w in word_list:
-        if w.isalpha():
-            list_num = alphabet.index(w[0].lower())
-            if w.lower() in dict_list[list_num]:
-                match+=1
-            else:
-                mismatch+=1
+    for w in iter_words(text):
+        if _is_word(w, dict_list):
+            match+=1
         else:
             mismatch+=1
     return match,mismatch
 
+def _is_word(w, dict_list):
+    """
+    ----------------------------------------------------
+    Parameters:   w (str)
+                  dict_list (list or Dictionary)
+    Return:       True/False
+    Description:  Checks if w is an alphabetic word of dict_list (in lowercase)
+    ---------------------------------------------------
+    """
+    if not w.isalpha():
+        return False
+    if isinstance(dict_list, Dictionary):
+        return w.lower() in dict_list
+    alphabet = get_base('lower')
+    if w[0].lower() not in alphabet:
+        return False
+    return w.lower() in dict_list[alphabet.index(w[0].lower())]
+
 '______________________________________________________________________________'
 
 def is_plaintext(text, dict_list, threshold=0.9):
     """
     ----------------------------------------------------
     Parameters:   text (str)
-                  dict_list (list): dictionary list
+                  dict_list (list or Dictionary): dictionary list
                   threshold (float): number between 0 to 1
                       default value = 0.9
     Return:       True/False
@@ -254,21 +387,49 @@ def is_plaintext(text, dict_list, threshold=0.9):
                   If invalid threshold, set to default value of 0.9
                   An empty text should return False
                   Assumes a valid dict_list is passed
+                  Stops reading words once the result is known, see score_text
+    ---------------------------------------------------
+    """
+    return score_text(text, dict_list, threshold)[0]
+
+'______________________________________________________________________________'
+
+def score_text(text, dict_list, threshold=0.9):
+    """
+    ----------------------------------------------------
+    Parameters:   text (str)
+                  dict_list (list or Dictionary): dictionary list
+                  threshold (float): number between 0 to 1
+                      default value = 0.9
+    Return:       result (bool): same as is_plaintext
+                  words (int): #words examined
+    Description:  Incremental version of is_plaintext
+                  Words are read one at a time (iter_words) and scoring
+                      stops as soon as #matches/#words is certain to be
+                      >= threshold or certain to be < threshold
+                  #words is bounded by #spaces + #newlines + 1, which is
+                      counted without splitting the text
+                  A text without words is not a plaintext
     ---------------------------------------------------
     """
-    if text == '':
-        return False
-    
-    result = analyze_text(text, dict_list)
-    
-    percentage = result[0]/(result[0]+result[1])
-    
     if type(threshold) != float or threshold < 0 or threshold > 1:
-        threshold = 0.9 
-    
-    if percentage >= threshold:
-        return True
-    return False
+        threshold = 0.9
+    # upper bound of #words
+    limit = text.count(' ') + text.count('\n') + 1
+    match = 0
+    mismatch = 0
+    for w in iter_words(text):
+        if _is_word(w, dict_list):
+            match+=1
+            if match/limit >= threshold:
+                return True, match + mismatch
+        else:
+            mismatch+=1
+            if (limit - mismatch)/limit < threshold:
+                return False, match + mismatch
+    if match + mismatch == 0:
+        return False, 0
+    return match/(match + mismatch) >= threshold, match + mismatch
 
 '______________________________________________________________________________'
 
@@ -392,11 +553,8 @@ def get_positions(text,base):
     ---------------------------------------------------
     """
     assert type(text) == str and type(base) == str, 'invalid input'
-    positions = []
-    for i in range(len(text)):
-        if text[i] in base:
-            positions.append([text[i],i])
-    return positions
+    base = set(base)
+    return [[text[i],i] for i in range(len(text)) if text[i] in base]
 
 '______________________________________________________________________________'
 
@@ -412,11 +570,8 @@ def clean_text(text,base):
     ---------------------------------------------------
     """
     assert type(text) == str and type(base) == str, 'invalid input'
-    updated_text = ''
-    for char in text:
-        if char not in base:
-            updated_text += char
-    return updated_text
+    base = set(base)
+    return ''.join([char for char in text if char not in base])
 
 '______________________________________________________________________________'
 
@@ -428,15 +583,52 @@ def insert_positions(text, positions):
     Return:       updated_text (str)
     Description:  Inserts all characters in the positions 2D list (generated by get_positions)
                   into their respective locations
-                  Assumes a valid positions 2d list is given
+                  An item may also hold a run of characters, e.g. ['--',4]
+                  Assumes a valid positions 2d list is given (ordered by position)
+                  The text is rebuilt once, in linear time
     Asserts:      text is a string and positions is a list
     ---------------------------------------------------
     """
     assert type(text) == str and type(positions) == list, 'invalid input'
-    updated_text = text
+    pieces = []
+    start = 0
+    length = 0
     for item in positions:
-        updated_text = updated_text[:item[1]]+ item[0] + updated_text[item[1]:]
-    return updated_text
+        end = start + item[1] - length
+        pieces.append(text[start:end])
+        pieces.append(item[0])
+        start = end
+        length = item[1] + len(item[0])
+    pieces.append(text[start:])
+    return ''.join(pieces)
+
+'______________________________________________________________________________'
+
+_PASSTHROUGH_PATTERNS = {}
+
+def split_passthrough(text,base):
+    """
+    ----------------------------------------------------
+    Parameters:   text (str): input string
+                  base (str): characters to keep
+    Return:       cleaned_text (str): text with only base characters
+                  passthrough (2D list): [[run1,pos1], [run2,pos2],...]
+    Description:  Splits a text into the characters of base and the runs of
+                  all other characters with their positions, in one pass
+                  insert_positions(cleaned_text, passthrough) restores the text
+                  Example: split_passthrough('go-go!!', get_base('lower')) -->
+                      'gogo', [['-',2],['!!',5]]
+                  The matching pattern of every base is compiled once
+    Asserts:      text and base are strings
+    ---------------------------------------------------
+    """
+    assert type(text) == str and type(base) == str, 'invalid input'
+    pattern = _PASSTHROUGH_PATTERNS.get(base)
+    if pattern is None:
+        pattern = re.compile('[^' + re.escape(base) + ']+' if base else '.+', re.S)
+        _PASSTHROUGH_PATTERNS[base] = pattern
+    passthrough = [[m.group(),m.start()] for m in pattern.finditer(text)]
+    return pattern.sub('',text), passthrough
 
 '______________________________________________________________________________'
 
@@ -456,15 +648,59 @@ def text_to_blocks(text,b_size,padding = False,pad =PAD):
     """
     assert type(text) == str and type(b_size) == int and b_size > 0, 'invalid input'
     
-    blocks = [text[i*b_size:(i+1)*b_size] for i in range(ceil(len(text)/b_size))]
+    blocks = [text[i:i+b_size] for i in range(0, len(text), b_size)]
     
-    if padding:
-        if (len(blocks) == 1 and len(blocks[0] < b_size)) or \
-            len(blocks) > 1 and len(blocks[-1]) < len(blocks[0]):
-                blocks[-1] += pad*(b_size - len(blocks[-1]))
+    if padding and blocks and len(blocks[-1]) < b_size:
+        blocks[-1] += pad*(b_size - len(blocks[-1]))
     
     return blocks
 
+def iter_blocks(source, b_size, padding = False, pad = PAD, chunk_size = 65536):
+    """
+    ----------------------------------------------------
+    Parameters:   source (str, bytes, bytearray, memoryview or file):
+                      text or an object with a read(size) method
+                      (text or binary mode)
+                  b_size (int)
+                  padding (bool): False(default) = no padding, True = padding
+                  pad (str): padding character, default = PAD
+                  chunk_size (int): #characters read at a time, default = 65536
+    Return:       blocks (generator): blocks of text_to_blocks, one at a time
+                      blocks of bytes-like sources and binary files are bytes
+    Description:  Streaming version of text_to_blocks
+                  Strings and bytes-like sources are sliced
+                  Files are read in chunks, only one chunk is kept in memory
+    Asserts:      b_size is a positive integer
+    ---------------------------------------------------
+    """
+    assert type(b_size) == int and b_size > 0, 'invalid input'
+    if type(source) == str:
+        yield from text_to_blocks(source, b_size, padding, pad)
+        return
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = memoryview(source).cast('B')
+        full = len(source) - len(source) % b_size
+        for i in range(0, full, b_size):
+            yield bytes(source[i:i+b_size])
+        rest = bytes(source[full:])
+    else:
+        chunk_size = max(chunk_size - chunk_size % b_size, b_size)
+        rest = None
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            text = chunk if rest is None else rest + chunk
+            full = len(text) - len(text) % b_size
+            for i in range(0, full, b_size):
+                yield text[i:i+b_size]
+            rest = text[full:]
+    if rest:
+        if padding:
+            fill = pad*(b_size - len(rest))
+            rest += fill.encode('latin-1') if isinstance(rest, bytes) else fill
+        yield rest
+
 '______________________________________________________________________________'
 
 def blocks_to_baskets(blocks):
@@ -474,12 +710,13 @@ def blocks_to_baskets(blocks):
     Return:       baskets: (list): list of equal size strings
     Description:  Create k baskets, where k = block_size
                   basket[i] contains the ith character from each block
+                  i.e. every kth character of the joined blocks, see text_to_baskets
     Errors:       if blocks are not strings or are of different sizes -->
                     print 'Error(blocks_to_baskets): invalid blocks', return []
     ----------------------------------------------------
     """
     valid_input = True
-    if type(blocks) != list or list == []:
+    if type(blocks) != list or blocks == []:
         valid_input = False
     else:
         for b in blocks:
@@ -495,17 +732,29 @@ def blocks_to_baskets(blocks):
     
     baskets = []
     if valid_input:      
-        n = len(blocks[0])
-        for j in range(n):
-            basket = ''
-            for i in range(len(blocks)):
-                if j < len(blocks[i]):
-                    basket+=blocks[i][j]
-            baskets.append(basket)
+        baskets = text_to_baskets(''.join(blocks), len(blocks[0]))
     else:
         print('Error(blocks_to_baskets): invalid blocks')
     return baskets
 
+def text_to_baskets(text, k):
+    """
+    ----------------------------------------------------
+    Parameters:   text (str, bytes, bytearray or memoryview)
+                  k (int): #baskets (period)
+    Return:       baskets (list): basket j contains every kth character
+                      of text starting at index j, i.e. text[j::k]
+    Description:  Same as blocks_to_baskets(text_to_blocks(text, k)) without
+                      creating the blocks, the last block may be shorter
+                  For bytes, baskets are memoryview slices of text (no copy)
+    Asserts:      k is a positive integer
+    ----------------------------------------------------
+    """
+    assert type(k) == int and k > 0, 'invalid input'
+    if isinstance(text, (bytes, bytearray, memoryview)):
+        text = memoryview(text)
+    return [text[j::k] for j in range(k)]
+
 '______________________________________________________________________________'
 
 def compare_texts(text1,text2):
@@ -538,14 +787,299 @@ def get_freq(text,base = ''):
     Return:       count_list (list of floats) 
     Description:  Finds character frequencies (count) in a given text
                   Default is English language (counts both upper and lower case)
+                      base = '' and base = None are both English
                   Otherwise returns frequencies of characters defined in base
+                  The text is read once, see FreqCounter for texts in chunks
     Assert:       text is a string
     ----------------------------------------------------
     """
     assert type(text) == str , 'invalid input'
-    if base == None:        
-        return [text.count(chr(97+i))+text.count(chr(65+i)) for i in range(26)]
-    return [text.count(char) for char in base]
+    return _counts_to_freq(Counter(text), base)
+
+def _counts_to_freq(counts, base):
+    """
+    ----------------------------------------------------
+    Parameters:   counts (Counter): character --> count
+                  base (str)
+    Return:       count_list (list of ints)
+    Description:  Output of get_freq for the given character counts
+    ----------------------------------------------------
+    """
+    if base == None or base == '':
+        return [counts[chr(97+i)]+counts[chr(65+i)] for i in range(26)]
+    return [counts[char] for char in base]
+
+'______________________________________________________________________________'
+
+class FreqCounter:
+    """
+    ----------------------------------------------------
+    Description: Character counts of a text that is read in chunks
+                 After update(chunk) for every chunk of a text,
+                     get_freq(base) is the same as get_freq(text, base)
+                 Counters of different parts of a text (e.g. computed by
+                     different processes) are combined using merge
+    ----------------------------------------------------
+    """
+    def __init__(self, text=''):
+        """
+        ----------------------------------------------------
+        Parameters:   text (str): first chunk, default = ''
+        Description:  Creates a counter of the characters of text
+        ---------------------------------------------------
+        """
+        self._counts = Counter()
+        self.update(text)
+
+    def update(self, text):
+        """
+        ----------------------------------------------------
+        Parameters:   text (str): next chunk
+        Return:       no return
+        Description:  Adds the characters of text to the counts
+        Assert:       text is a string
+        ---------------------------------------------------
+        """
+        assert type(text) == str , 'invalid input'
+        self._counts.update(text)
+        return None
+
+    def merge(self, other):
+        """
+        ----------------------------------------------------
+        Parameters:   other (FreqCounter)
+        Return:       no return
+        Description:  Adds the counts of other to the counts
+        Assert:       other is a FreqCounter
+        ---------------------------------------------------
+        """
+        assert isinstance(other, FreqCounter), 'invalid input'
+        self._counts.update(other._counts)
+        return None
+
+    def get_counts(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       counts (Counter): a copy of character --> count
+        ---------------------------------------------------
+        """
+        return Counter(self._counts)
+
+    def get_freq(self, base=''):
+        """
+        ----------------------------------------------------
+        Parameters:   base (str): default = '' (English)
+        Return:       count_list (list of ints)
+        Description:  Same as get_freq for all the chunks seen so far
+        ---------------------------------------------------
+        """
+        return _counts_to_freq(self._counts, base)
+
+'______________________________________________________________________________'
+
+_NON_LETTERS = bytes([i for i in range(256) if not 97 <= i <= 122])
+
+def _to_letters(text):
+    """
+    ----------------------------------------------------
+    Parameters:   text (str)
+    Return:       letters (bytes): character codes of the English letters
+                      of text in lower case, other characters are removed
+    ---------------------------------------------------
+    """
+    return text.encode('latin-1', 'ignore').lower().translate(None, _NON_LETTERS)
+
+def get_letter_counts(texts):
+    """
+    ----------------------------------------------------
+    Parameters:   texts (list): list of strings
+    Return:       counts (2D list): counts[i] is
+                      get_freq(texts[i]) (26 counts per text)
+    Description:  Counts the English letters of many texts in one pass
+                  If numpy is installed, the character codes of all texts
+                      are counted by one bincount
+    ---------------------------------------------------
+    """
+    counts = _count_letters(texts)
+    if np is not None:
+        return counts.tolist()
+    return counts
+
+def _count_letters(texts):
+    """
+    ----------------------------------------------------
+    Parameters:   texts (list): list of strings
+    Return:       counts (2D list or numpy array of shape (#texts, 26))
+    Description:  Implementation of get_letter_counts, the numpy array is
+                      used as is by score_texts and NgramModel
+    ---------------------------------------------------
+    """
+    codes = [_to_letters(text) for text in texts]
+    if np is None:
+        counts = []
+        for c in codes:
+            counter = Counter(c)
+            counts.append([counter[97 + i] for i in range(26)])
+        return counts
+    ids = np.repeat(np.arange(len(codes)), [len(c) for c in codes])
+    data = np.frombuffer(b''.join(codes), dtype=np.uint8).astype(np.intp) - 97
+    return np.bincount(ids * 26 + data, minlength=26 * len(codes)).reshape(len(codes), 26)
+
+def chi_squared(text, language='English'):
+    """
+    ----------------------------------------------------
+    Parameters:   text (str)
+                  language (str): default = English
+    Return:       result (float)
+    Description:  Chi-squared statistic of the English letters of text
+                      (case insensitive) against get_language_freq
+                  The smaller the result, the closer text is to the language
+                  A text without letters gets float('inf')
+                  If unsupported language, print error msg and return -1.0
+    ---------------------------------------------------
+    """
+    scores = score_texts([text], 'chi_squared', language)
+    if scores == []:
+        return -1.0
+    return scores[0]
+
+def index_of_coincidence(text):
+    """
+    ----------------------------------------------------
+    Parameters:   text (str)
+    Return:       result (float)
+    Description:  Probability that two letters of text (case insensitive),
+                      picked at random without replacement, are the same
+                  About 0.066 for English and 0.038 for random letters
+                  A text with less than two letters gets 0.0
+    ---------------------------------------------------
+    """
+    return score_texts([text], 'ioc')[0]
+
+def score_texts(texts, method='chi_squared', language='English'):
+    """
+    ----------------------------------------------------
+    Parameters:   texts (list): list of strings
+                  method (str): chi_squared (default) or ioc
+                  language (str): default = English (used by chi_squared)
+    Return:       scores (list of floats): one score per text
+    Description:  Scores many texts at once, e.g. all candidate plaintexts
+                      of a key search
+                  The letters of all texts are counted at once (get_letter_counts),
+                      with numpy the scores are computed for all texts at once
+    Errors:       if undefined method, print error msg, return []
+    ---------------------------------------------------
+    """
+    if method not in ['chi_squared', 'ioc']:
+        print('Error(score_texts): undefined method')
+        return []
+    counts = _count_letters(texts)
+    if method == 'chi_squared':
+        freq = get_language_freq(language)
+        if freq == []:
+            return []
+    if np is not None:
+        n = counts.sum(axis=1).astype(float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if method == 'chi_squared':
+                expected = n[:, None] * np.array(freq)
+                scores = ((counts - expected) ** 2 / expected).sum(axis=1)
+                scores[n == 0] = float('inf')
+            else:
+                scores = (counts * (counts - 1)).sum(axis=1) / (n * (n - 1))
+                scores[n < 2] = 0.0
+        return scores.tolist()
+    scores = []
+    for c in counts:
+        n = sum(c)
+        if method == 'chi_squared':
+            if n == 0:
+                scores.append(float('inf'))
+            else:
+                scores.append(sum([(c[i] - n * freq[i]) ** 2 / (n * freq[i]) for i in range(26)]))
+        elif n < 2:
+            scores.append(0.0)
+        else:
+            scores.append(sum([x * (x - 1) for x in c]) / (n * (n - 1)))
+    return scores
+
+'______________________________________________________________________________'
+
+class NgramModel:
+    """
+    ----------------------------------------------------
+    Description: Log-likelihood of texts under an n-gram model of English letters
+                 Only the letters of a text are used (in lower case), so
+                     n-grams span spaces and punctuation
+                 n-grams that never appear in the corpus get the log
+                     probability of 0.01 occurrences
+    ----------------------------------------------------
+    """
+    def __init__(self, corpus=None, n=1):
+        """
+        ----------------------------------------------------
+        Parameters:   corpus (str): text used to count n-grams
+                          default = None (get_language_freq, only for n = 1)
+                      n (int): default = 1
+        Description:  Builds the table of log10 probabilities of all n-grams
+        Asserts:      n is a positive integer, corpus is a string if n > 1
+        ---------------------------------------------------
+        """
+        assert type(n) == int and n > 0 and (corpus is not None or n == 1), 'invalid input'
+        self._n = n
+        if corpus is None:
+            freq = get_language_freq()
+            self._logs = {get_base('lower')[i]: log10(freq[i]) for i in range(26)}
+            self._floor = log10(min(freq) / 100)
+        else:
+            letters = _to_letters(corpus).decode()
+            grams = Counter([letters[i:i + n] for i in range(len(letters) - n + 1)])
+            total = max(sum(grams.values()), 1)
+            self._logs = {g: log10(grams[g] / total) for g in grams}
+            self._floor = log10(0.01 / total)
+
+    def get_n(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       n (int)
+        ---------------------------------------------------
+        """
+        return self._n
+
+    def score(self, text):
+        """
+        ----------------------------------------------------
+        Parameters:   text (str)
+        Return:       log_likelihood (float): sum of the log10 probabilities
+                          of the n-grams of text, higher is more English
+        Description:  Each distinct n-gram is looked up once
+        ---------------------------------------------------
+        """
+        letters = _to_letters(text).decode()
+        n = self._n
+        grams = Counter([letters[i:i + n] for i in range(len(letters) - n + 1)])
+        logs = self._logs
+        floor = self._floor
+        return float(sum([count * logs.get(g, floor) for g, count in grams.items()]))
+
+    def score_texts(self, texts):
+        """
+        ----------------------------------------------------
+        Parameters:   texts (list): list of strings
+        Return:       scores (list of floats): score of every text
+        Description:  For n = 1 the letter counts of all texts are computed
+                      at once (get_letter_counts) and multiplied by the log table
+        ---------------------------------------------------
+        """
+        if self._n > 1:
+            return [self.score(text) for text in texts]
+        logs = [self._logs.get(c, self._floor) for c in get_base('lower')]
+        counts = _count_letters(texts)
+        if np is not None:
+            return (counts @ np.array(logs)).tolist()
+        return [sum([c[i] * logs[i] for i in range(26)]) for c in counts]
 
 '______________________________________________________________________________'
 
@@ -710,11 +1244,9 @@ def _encode_B6(c):
     if not isinstance(c,str) or len(c)!= 1:
         print('Error(encode_B6): invalid input')
         return ''
-    code = get_base('B6')
-    if c not in code:
+    if c not in B6_CODES:
         return ''
-    indx = code.index(c)
-    return dec_to_bin(indx,6)
+    return _B6_BINARY[B6_CODES[c]]
 
 '______________________________________________________________________________'
 
@@ -757,7 +1289,66 @@ def _decode_B6(b):
     if not isinstance(b,str) or len(b)!=6 or not is_binary(b):
         print('Error(decode_B6): invalid input')
         return ''
-    value = bin_to_dec(b)
-    B6Code = get_base('B6')
-    return B6Code[value]
+    return B6_CHARS[int(b,2)]
+
+'______________________________________________________________________________'
+
+# B6 codec tables, built once:
+#   B6_CHARS[code] --> character, B6_CODES[character] --> code
+#   _B6_BINARY[code] --> 6-bit binary string
+#   _B6_ENCODE/_B6_DECODE: bytes.translate tables between ASCII and codes
+B6_CHARS = get_base('B6')
+B6_CODES = {B6_CHARS[i]: i for i in range(len(B6_CHARS))}
+_B6_BINARY = [dec_to_bin(i,6) for i in range(len(B6_CHARS))]
+_B6_ENCODE = bytes([B6_CODES.get(chr(i),0) for i in range(256)])
+_B6_DECODE = B6_CHARS.encode('ascii') + bytes(256 - len(B6_CHARS))
+_B6_PATTERN = re.compile('[' + re.escape(B6_CHARS) + ']*')
+
+def encode_B6_text(text):
+    """
+    ----------------------------------------------------
+    Parameters:   text (str): text of B6 characters
+    Return:       codes (bytes): B6 code of every character
+    Description:  Bulk version of _encode_B6
+                  codes[i] is the position of text[i] in the B6 base
+                  Example: encode_B6_text('ab.') --> b'\\x00\\x01\\x3e'
+    Errors:       if text is not a string of B6 characters -->
+                      print 'Error(encode_B6_text): invalid input' and return b''
+    ---------------------------------------------------
+    """
+    if not isinstance(text,str) or not _B6_PATTERN.fullmatch(text):
+        print('Error(encode_B6_text): invalid input')
+        return b''
+    return text.encode('ascii').translate(_B6_ENCODE)
+
+def decode_B6_codes(codes):
+    """
+    ----------------------------------------------------
+    Parameters:   codes (bytes, list or array): B6 codes (integers 0 to 63)
+                      arrays of any integer type, including numpy arrays
+    Return:       text (str)
+    Description:  Bulk version of _decode_B6
+                  Example: decode_B6_codes([0,1,62]) --> 'ab.'
+                  bytes-like codes are used as is, other sequences are
+                      read one code per element
+    Errors:       if codes is not a sequence of integers between 0 and 63 -->
+                      print 'Error(decode_B6_codes): invalid input' and return ''
+    ---------------------------------------------------
+    """
+    if isinstance(codes, int):
+        print('Error(decode_B6_codes): invalid input')
+        return ''
+    try:
+        if isinstance(codes, (bytes, bytearray)) or \
+           (isinstance(codes, memoryview) and codes.itemsize == 1):
+            codes = bytes(codes)
+        else:
+            codes = bytes(bytearray([operator.index(c) for c in codes]))
+    except (TypeError, ValueError):
+        print('Error(decode_B6_codes): invalid input')
+        return ''
+    if codes and max(codes) >= len(B6_CHARS):
+        print('Error(decode_B6_codes): invalid input')
+        return ''
+    return codes.translate(_B6_DECODE).decode('ascii')
 